@@ -0,0 +1,5 @@
+'''interactive-latency benchmarks for synthetic graphs
+
+Run with `python -m benchmarks` (see `--help`); the Qt platform defaults to
+offscreen.
+'''
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from subprocess import run, PIPE
+from statistics import median
+from time import perf_counter
+from datetime import datetime, timezone
+import platform
+import sys
+
+parser = ArgumentParser(
+    prog='python -m benchmarks',
+    description='measure load, save and propagation times of synthetic graphs',
+)
+parser.add_argument('--shapes', nargs='+', default=['chain', 'fanout', 'diamond', 'random'],
+                    help='graph shapes (default: all)')
+parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 5000],
+                    help='numbers of nodes (default: 10 100 1000 5000)')
+parser.add_argument('--repeat', type=int, default=10,
+                    help='input changes per graph for the latency (default: 10)')
+parser.add_argument('--seed', type=int, default=0, help='seed for the random shape (default: 0)')
+parser.add_argument('-o', '--output', type=Path, help='write the JSON here instead of stdout')
+parser.add_argument('--case', nargs=2, metavar=('SHAPE', 'N'), help='run one case in this process')
+args = parser.parse_args()
+
+
+def timed(func, *args):
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter() - start, result
+
+
+def peak_rss():
+    '''peak resident set size of this process, in bytes'''
+    from resource import getrusage, RUSAGE_SELF
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return getrusage(RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_case(shape, n):
+    from flowgraph import QApplication, Window, store
+    from benchmarks.graphs import build
+
+    app = QApplication([])
+    baseline = peak_rss()
+
+    window = Window('benchmark')
+    build_time, edges = timed(build, window.editor().scene(), shape, n, args.seed)
+    app.processEvents()
+
+    state_time, state = timed(window.state)
+    dump_time, text = timed(dumps, state)
+    with TemporaryDirectory() as directory:
+        write_time, _ = timed(store.write, Path(directory) / 'graph.json', window)
+    window.close()
+
+    window = Window('benchmark')
+    load_time, _ = timed(window.setState, loads(text))
+    app.processEvents()
+
+    widgets = window.editor().scene().widgets()
+    entry = widgets[0].entries()[0]
+    propagate, settle, evaluations = [], [], []
+    for i in range(args.repeat):
+        calls = sum(widget.stats()['calls'] for widget in widgets)
+        start = perf_counter()
+        entry.setValue(float(i + 1))  # every node's value changes
+        propagate.append(perf_counter() - start)
+        app.processEvents()
+        settle.append(perf_counter() - start)
+        evaluations.append(sum(widget.stats()['calls'] for widget in widgets) - calls)
+
+    return dict(
+        shape=shape,
+        nodes=n,
+        edges=edges,
+        build=build_time,
+        save=dict(state=state_time, dump=dump_time, total=state_time + dump_time, write=write_time, bytes=len(text)),
+        load=load_time,
+        latency=dict(
+            propagate=dict(median=median(propagate), min=min(propagate), max=max(propagate)),
+            settle=dict(median=median(settle), min=min(settle), max=max(settle)),
+            evaluations=dict(median=median(evaluations), min=min(evaluations), max=max(evaluations)),
+        ),
+        memory=dict(baseline=baseline, peak=peak_rss()),
+    )
+
+
+if args.case is not None:
+    shape, n = args.case
+    print(dumps(run_case(shape, int(n))))
+    sys.exit()
+
+env = dict(environ)
+env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+root = Path(__file__).resolve().parent.parent
+env['PYTHONPATH'] = str(root) + (':' + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+
+results = []
+for shape in args.shapes:
+    for n in args.sizes:
+        # one process per case, so that the peak memory is that of the case
+        command = [ sys.executable, '-m', 'benchmarks', '--case', shape, str(n),
+                    '--repeat', str(args.repeat), '--seed', str(args.seed) ]
+        process = run(command, stdout=PIPE, env=env, cwd=root, text=True)
+        if process.returncode != 0:
+            results.append(dict(shape=shape, nodes=n, error=process.returncode))
+            continue
+        results.append(loads(process.stdout.splitlines()[-1]))
+        print(f'{shape:>8} {n:>5}: load {results[-1]["load"]:.3f}s', file=sys.stderr)
+
+report = dict(
+    date=datetime.now(timezone.utc).isoformat(),
+    python=platform.python_version(),
+    platform=platform.platform(),
+    qt_platform=env['QT_QPA_PLATFORM'],
+    results=results,
+)
+if args.output is None:
+    print(dumps(report, indent='\t'))
+else:
+    args.output.write_text(dumps(report, indent='\t') + '\n')
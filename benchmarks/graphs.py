@@ -0,0 +1,71 @@
+__all__ = 'SHAPES', 'build', 'source', 'step', 'join'
+
+from random import Random
+from flowgraph import function, ClampedFloat
+from flowgraph.backend import QPointF
+
+# a plain float would be clamped by the spin box (to 99.99), and the nodes
+# past that would stop changing; joins average, so values stay near the input
+Value = ClampedFloat[-1e12:1e12]
+
+
+def source(x: Value) -> Value:
+    return x
+
+
+def step(x: Value) -> Value:
+    return x + 1
+
+
+def join(a: Value, b: Value) -> Value:
+    return (a + b) / 2
+
+
+def chain(n, seed):
+    '''source -> step -> step -> ...'''
+    return [ () ] + [ (i - 1,) for i in range(1, n) ]
+
+
+def fanout(n, seed):
+    '''one source feeding n - 1 steps'''
+    return [ () ] + [ (0,) for i in range(1, n) ]
+
+
+def diamond(n, seed):
+    '''a chain of diamonds: join <- (step, step) <- join <- ...'''
+    inputs = [ () ]
+    while len(inputs) < n:
+        top = len(inputs) - 1
+        inputs += [ (top,), (top,) ]
+        if len(inputs) < n:
+            inputs.append((top + 1, top + 2))
+    return inputs[:n]
+
+
+def random_dag(n, seed):
+    '''every node takes one or two earlier nodes as inputs'''
+    random = Random(seed)
+    return [ () ] + [
+        tuple(random.sample(range(i), min(i, random.choice((1, 2)))))
+        for i in range(1, n)
+    ]
+
+
+SHAPES = dict(chain=chain, fanout=fanout, diamond=diamond, random=random_dag)
+
+
+def build(scene, shape, n, seed=0, columns=50):
+    '''add a graph of `n` nodes to the scene; return the number of edges
+
+    Node 0 is the only source: its first entry is the input.
+    '''
+    inputs = SHAPES[shape](n, seed)
+    for i, args in enumerate(inputs):
+        func = (source, step, join)[len(args)]
+        scene.addNode(function.Widget(func), QPointF(250 * (i % columns), 150 * (i // columns)))
+    edges = 0
+    for i, args in enumerate(inputs):
+        for e, j in enumerate(args):
+            scene.addEdge((j, 1), (i, e))
+            edges += 1
+    return edges
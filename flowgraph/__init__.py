@@ -1,5 +1,18 @@
-from .backend import QApplication
-from .window import *
 from .constrained import *
 from .util import *
 from .plottable import *
+from . import constrained, util, plottable
+
+__all__ = ('QApplication', 'Window') + constrained.__all__ + util.__all__ + plottable.__all__
+
+
+def __getattr__(name):
+    # Qt is only imported when asked for, so that `flowgraph.headless` (and
+    # modules that just need the annotations) work without it
+    if name == 'QApplication':
+        from .backend import QApplication
+        return QApplication
+    if name == 'Window':
+        from .window import Window
+        return Window
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
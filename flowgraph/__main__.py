@@ -3,7 +3,6 @@
 from pathlib import Path
 from argparse import ArgumentParser
 from argcomplete import autocomplete
-from sys import stderr
 from debug import debug
 
 app_name = 'Flow Graph Demo'
@@ -13,31 +12,41 @@ parser = ArgumentParser(
 )
 parser.add_argument(
     'state', type=Path, nargs='?', default=Path('nodes.json'),
-    help='state file which defines the graphical nodes (default: nodes.json)'
+    help='state file (or .flowgraph bundle) which defines the graphical nodes (default: nodes.json)'
+)
+parser.add_argument(
+    '--profile-startup', action='store_true',
+    help='report how long the imports and building the window take (to stderr)'
 )
 autocomplete(parser)
 args = parser.parse_args()
 
-from tempfile import NamedTemporaryFile
-from shutil import copy
-from pysh import Thread, proc  # noqa: E402
-from glob import glob  # noqa: E402
-from termcolor import colored  # noqa: E402
-from json import load, dump
-from .window import Window
-from .backend import QApplication
-
-app = QApplication([])
-
-win = Window(app_name)
-if args.state.exists():
-    with args.state.open('r') as file:
-        state = load(file)
-    win.setState(state)
+from .startup import Profile  # noqa: E402
+profile = Profile(enabled=args.profile_startup)
+profile.start()
+
+with profile.phase('import'):
+    from .window import Window
+    from .backend import QApplication
+    from . import store
+
+with profile.phase('QApplication'):
+    app = QApplication([])
+
+with profile.phase('Window'):
+    win = Window(app_name)
+
+with profile.phase('load'):
+    args.state = store.location(args.state)
+    if args.state.exists():
+        state, values = store.read(args.state)
+        with store.using(values):
+            win.setState(state)
+    win.startJournal(args.state)
+
+profile.stop()
+profile.report()
 app.exec()
 
-with NamedTemporaryFile('w') as file:
-    dump(win.state(), file, indent='\t')
-    print(file=file)
-    file.flush()
-    copy(file.name, args.state)
+store.write(args.state, win, derived=win.editor().scene().savesDerived())
+win.journal().stop(remove=True)
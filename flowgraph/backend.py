@@ -5,14 +5,23 @@ from PyQt5.QtWidgets import (
     QLabel, QLineEdit, QFileDialog, QPushButton, QCheckBox,
     QGraphicsView, QGraphicsItem, QGraphicsWidget, QGraphicsTextItem, QGraphicsSceneMouseEvent, QGraphicsProxyWidget, QGraphicsSceneContextMenuEvent,
     QMenu, QAction, QFrame,
-    QGraphicsScene, QGroupBox, QSlider, QDoubleSpinBox, QSpinBox, QTextEdit, QPlainTextEdit, QErrorMessage, QMessageBox, QSizeGrip, QComboBox
+    QGraphicsScene, QGroupBox, QSlider, QDoubleSpinBox, QSpinBox, QTextEdit, QPlainTextEdit, QErrorMessage, QMessageBox, QSizeGrip, QComboBox, QSizePolicy
 )
-from PyQt5.QtGui import QKeySequence, QColor, QPainter, QPainterPath, QPen, QBrush, QMouseEvent, QWheelEvent, QKeyEvent, QCursor, QContextMenuEvent, QTransform, QFont, QFontMetrics, QClipboard
-from PyQt5.QtCore import pyqtSlot, pyqtSignal, Qt, QRect, QRectF, QPoint, QPointF, QObject
+from PyQt5.QtGui import QKeySequence, QColor, QPainter, QPainterPath, QPainterPathStroker, QPen, QBrush, QMouseEvent, QWheelEvent, QKeyEvent, QCursor, QContextMenuEvent, QTransform, QFont, QFontMetrics, QClipboard
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, Qt, QRect, QRectF, QPoint, QPointF, QObject, QTimer, QSize
 from functools import cache
 from funcpipes import Pipe
 from debug import debug
 from contextlib import contextmanager
+import sys
+
+# PyQt aborts when a slot raises, unless there is an excepthook of our own;
+# pyqtgraph used to install one on import, but it is only imported when a
+# plot is needed now
+if sys.excepthook is sys.__excepthook__:
+    def print_exception(*args):
+        return sys.__excepthook__(*args)
+    sys.excepthook = print_exception
 
 
 @cache
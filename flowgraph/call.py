@@ -0,0 +1,37 @@
+__all__ = 'cast', 'try_to', 'coerce', 'split_results'
+
+from inspect import Parameter
+from functools import wraps
+
+
+def cast(param: Parameter):
+    anno = param.annotation
+    return anno if anno and anno != Parameter.empty else lambda x: x
+
+
+def try_to(f):
+    @wraps(f)
+    def do_f(x):
+        try:
+            return f(x)
+        except Exception:
+            return x
+    return do_f
+
+
+def coerce(values, signature):
+    '''cast the raw entry values to the types the function's parameters ask for'''
+    return [
+        try_to(cast(param))(value)
+        for value, param in zip(values, signature.parameters.values())
+    ]
+
+
+def split_results(results, n_returns):
+    '''turn whatever the function returned into one value per return entry'''
+    if n_returns == 1:
+        return results,
+    if results is None:
+        results = ()
+    assert n_returns == len(results), (n_returns, results)
+    return tuple(results)
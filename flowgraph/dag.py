@@ -0,0 +1,138 @@
+__all__ = 'topological_order', 'ancestors', 'Scheduler'
+
+from collections import deque
+from contextlib import contextmanager
+from . import trace
+
+
+def topological_order(nodes, upstream):
+    '''order `nodes` so that each one comes after everything upstream of it
+
+    nodes: the nodes to order (anything hashable)
+    upstream: callable returning the nodes that feed a given node; nodes not
+              in `nodes` are ignored
+
+    Nodes on a cycle cannot be ordered; they are appended in their original
+    order.
+    '''
+    nodes = list(nodes)
+    indegree = { node: 0 for node in nodes }
+    downstream = { node: [] for node in nodes }
+    for node in nodes:
+        for up in set(upstream(node)):
+            if up is node or up not in indegree:
+                continue
+            indegree[node] += 1
+            downstream[up].append(node)
+
+    ready = deque(node for node in nodes if indegree[node] == 0)
+    order = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for down in downstream[node]:
+            indegree[down] -= 1
+            if indegree[down] == 0:
+                ready.append(down)
+
+    if len(order) < len(nodes):
+        placed = set(order)
+        order.extend(node for node in nodes if node not in placed)
+    return order
+
+
+def ancestors(nodes, upstream):
+    '''the nodes and everything upstream of them'''
+    seen = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        stack.extend(upstream(node))
+    return seen
+
+
+class Scheduler:
+    '''run each requested node exactly once, upstream nodes first
+
+    nodes: callable returning every node in the graph
+    upstream: callable returning the nodes that feed a given node
+    wanted: callable returning the nodes whose outputs are wanted right now,
+            or None if all of them are (the default)
+
+    Nodes are anything with a `compute()` method; others (such as plain
+    `node.Widget`s) are only passed through. Requests made while a pass
+    is running (i.e., by the nodes being computed, as their outputs change)
+    are folded into that pass, so a node downstream of several changed nodes
+    runs once, after all of them, and never sees half-updated inputs.
+
+    When `wanted` returns nodes (pull evaluation), a request only marks the
+    node and everything downstream of it as pending; only the pending nodes
+    that the wanted ones depend on are run. The rest stay pending until they
+    are wanted or `demand`ed.
+    '''
+
+    def __init__(self, nodes, upstream, wanted=None):
+        self._nodes = nodes
+        self._upstream = upstream
+        self._wanted = wanted
+        self._pending = set()
+        self._running = False
+        self._deferred = 0
+
+    def pending(self):
+        return self._pending.copy()
+
+    def isPending(self, node):
+        return node in self._pending
+
+    def request(self, node):
+        trace.cause(node)
+        self._pending.add(node)
+        self.run()
+
+    def clear(self):
+        self._pending.clear()
+
+    def run(self, demanded=()):
+        if self._running or self._deferred:
+            return
+        self._running = True
+        try:
+            while self._pending:
+                order = topological_order(self._nodes(), self._upstream)
+                self._pending.intersection_update(order)
+
+                needed = None
+                wanted = self._wanted() if self._wanted is not None else None
+                if wanted is not None:
+                    for node in order:
+                        if any(up in self._pending for up in self._upstream(node)):
+                            self._pending.add(node)
+                    needed = ancestors([ *wanted, *demanded ], self._upstream)
+                    if self._pending.isdisjoint(needed):
+                        break
+
+                for node in order:
+                    if node in self._pending and (needed is None or node in needed):
+                        self._pending.discard(node)
+                        if hasattr(node, 'compute'):
+                            node.compute()
+        finally:
+            self._running = False
+
+    def demand(self, nodes):
+        '''bring `nodes` up to date, even if they are not wanted'''
+        self.run(demanded=nodes)
+
+    @contextmanager
+    def deferred(self):
+        '''collect requests without running them; run them on the way out'''
+        self._deferred += 1
+        try:
+            yield self
+        finally:
+            self._deferred -= 1
+        self.run()
@@ -1,12 +1,32 @@
-__all__ = 'Item',
+__all__ = 'Item', 'Layer'
 
 
 from debug import debug
-from .backend import QPainter, QRectF, get_pen, QContextMenuEvent, QMenu, QGraphicsItem, QPainterPath, QPointF, populate_menu
+from .backend import Qt, QPainter, QRectF, get_pen, QContextMenuEvent, QMenu, QGraphicsItem, QPainterPath, QPainterPathStroker, QPointF, populate_menu
 from .stateful import Stateful
 
 
+def add_curve(path, x0, y0, x3, y3, d, style):
+    '''add an edge from (x0, y0) to (x3, y3) to `path`; it leaves and enters horizontally, over `d`'''
+    path.moveTo(x0, y0)
+    if style == 'line':
+        path.lineTo(x0 + d, y0)
+        path.lineTo(x3 - d, y3)
+        path.lineTo(x3, y3)
+    elif style == 'cubic':
+        path.cubicTo(x0 + d, y0, x3 - d, y3, x3, y3)
+    else:
+        raise ValueError(f'{style=}')
+
+
 class Item(QGraphicsItem, Stateful):
+    '''an edge, drawn from the source socket to the sink socket (its parent)
+
+    The path is cached; `updatePath` must be called when either end moves
+    (`node.Item` does it for the sockets of a node that moves).
+    '''
+    pick_width = 8
+
     def __init__(self, source=None, sink=None):
         super().__init__()
         self.setFlags(
@@ -14,14 +34,18 @@ class Item(QGraphicsItem, Stateful):
             QGraphicsItem.GraphicsItemFlag.ItemIgnoresParentOpacity |
             QGraphicsItem.GraphicsItemFlag.ItemSendsScenePositionChanges  # type: ignore
         )
-        self.setSource(source)
-        self.setSink(sink)
         self._state = dict(
             protrusion=50,
             color='gray',
             width=1,
             style='cubic',
         )
+        self._source = None
+        self._path = None
+        self._shape = None
+        self.setAcceptHoverEvents(True)
+        self.setSource(source)
+        self.setSink(sink)
         self.setParentItem(sink)
         self.setZValue(-1)
 
@@ -29,7 +53,12 @@ class Item(QGraphicsItem, Stateful):
         return self._source
 
     def setSource(self, source):
+        if self._source is not None:
+            self._source.removeEdge(self)
         self._source = source
+        if source is not None:
+            source.addEdge(self)
+        self.updatePath()
 
     def sink(self):
         return self._sink
@@ -37,50 +66,242 @@ class Item(QGraphicsItem, Stateful):
     def setSink(self, sink):
         self._sink = sink
 
+    def updatePath(self):
+        self.prepareGeometryChange()
+        self._path = self._shape = None
+        layer = self.layer()
+        if layer is not None:
+            layer.invalidate()
+
+    def layer(self):
+        '''the scene's `Layer`, if it batches the edges'''
+        scene = self.scene()
+        return scene.edgeLayer() if scene is not None else None
+
+    def path(self):
+        if self._path is None:
+            self._path = self.buildPath()
+        return self._path
+
+    def shape(self):
+        '''the path, widened for picking (rather than the whole bounding rectangle)'''
+        if self._shape is None:
+            stroker = QPainterPathStroker()
+            stroker.setWidth(self.pick_width)
+            self._shape = stroker.createStroke(self.path())
+        return self._shape
+
     def boundingRect(self) -> QRectF:
-        return QRectF(QPointF(0, 0), self.source().mapToItem(self, QPointF(0, 0))).normalized()
+        w = max(3, self.pick_width) / 2  # 3: the width when selected
+        return self.path().controlPointRect().adjusted(-w, -w, w, w)
 
-    def paint(self, painter: QPainter, option, widget):
+    def buildPath(self):
         path = QPainterPath()
-        d: int = self._state['protrusion']  # type: ignore
-
+        if self.source() is None:
+            return path
         p0 = self.source().mapToItem(self, QPointF(0, 0))
-        p3 = QPointF(0, 0)
-        p1 = QPointF(p0.x() + d, p0.y())
-        p2 = QPointF(p3.x() - d, p3.y())
-
-        path.moveTo(p0)
-        style = self._state['style']
-
-        if style == 'line':
-            path.lineTo(p1)
-            path.lineTo(p2)
-            path.lineTo(p3)
-        elif style == 'cubic':
-            path.cubicTo(p1, p2, p3)
-        else:
-            raise ValueError(f"{self._state['style']=}")
+        add_curve(path, p0.x(), p0.y(), 0, 0, self._state['protrusion'], self._state['style'])
+        return path
 
+    def paint(self, painter: QPainter, option, widget):
+        scene = self.scene()
+        if scene is not None and scene.simplifies(option, painter):
+            painter.setRenderHint(QPainter.Antialiasing, False)
         painter.setPen(get_pen(self._state['color'], self._state['width']))
-        painter.drawPath(path)
+        painter.drawPath(self.path())
 
     def itemChange(self, change, value):
         if change == self.GraphicsItemChange.ItemSelectedHasChanged:
             self._state['width'] = 3 if self.isSelected() else 1
+            if self.layer() is not None and not self.isSelected():
+                self.layer().release(self)
+        elif change == self.GraphicsItemChange.ItemSceneChange and self.layer() is not None:
+            self.layer().invalidate()
+        elif change == self.GraphicsItemChange.ItemSceneHasChanged and self.layer() is not None:
+            self.layer().adopt(self)
         return super().itemChange(change, value)
 
+    def hoverLeaveEvent(self, event):
+        if self.layer() is not None:
+            self.layer().unhover(self)
+        super().hoverLeaveEvent(event)
+
     def contextMenuEvent(self, event: QContextMenuEvent) -> None:
         Menu(self).exec(event.globalPos())
 
     def iterState(self):
         yield from super().iterState()
         if self.source() is not None:
-            yield 'source', self.source()
+            yield 'source', self.source().entry().id()
+        if self.sink() is not None:
+            yield 'sink', self.sink().entry().id()
 
     def remove(self):
         self.sink().entry().unsetSource()
 
 
+class Layer(QGraphicsItem):
+    '''all the edges of a scene, drawn at once (see `editor.Scene.setBatchesEdges`)
+
+    The edges stay in the scene, but hidden, except for those that are selected
+    or under the mouse, which are shown as usual. The others are drawn as one
+    path per pen. Their bounding boxes are kept in a grid of `cell`-sized
+    squares, so that picking only looks at the edges near the point.
+
+    The hidden edges stay in the scene's BSP index, too. That is cheap: moving
+    nodes costs about as much either way (drawing dominates), while a scene
+    without an index (`QGraphicsScene.NoIndex`) makes `itemAt`, and so every
+    hover, look at every item.
+    '''
+    cell = 256
+
+    def __init__(self):
+        super().__init__()
+        self.setZValue(-1)
+        self.setAcceptHoverEvents(True)
+        self._dirty = True
+        self._edges = []
+        self._ends = None
+        self._boxes = None
+        self._grid = {}
+        self._rect = QRectF()
+        self._paths = None
+        self._hovered = None
+
+    def invalidate(self):
+        '''an edge was added, removed or moved'''
+        if not self._dirty:
+            self.prepareGeometryChange()
+            self._dirty = True
+        self._paths = None
+
+    def rebuild(self):
+        if not self._dirty:
+            return
+        import numpy as np
+        self._dirty = False
+        scene = self.scene()
+        self._edges = [ e for e in scene.edges() if e.source() is not None ] if scene is not None else []
+        ends = [ (e.source().scenePos(), e.sink().scenePos()) for e in self._edges ]
+        ends = np.array([ (p0.x(), p0.y(), p3.x(), p3.y()) for p0, p3 in ends ], dtype=float).reshape(-1, 4)
+        d = np.array([ e._state['protrusion'] for e in self._edges ], dtype=float)
+        w = max(3, Item.pick_width) / 2
+        x, y = ends[:, 0::2], ends[:, 1::2]
+        self._ends = ends
+        self._boxes = np.column_stack([ x.min(1) - d - w, y.min(1) - w, x.max(1) + d + w, y.max(1) + w ])
+        self._grid = {}
+        for i, (left, top, right, bottom) in enumerate((self._boxes // self.cell).astype(int).tolist()):
+            for cx in range(left, right + 1):
+                for cy in range(top, bottom + 1):
+                    self._grid.setdefault((cx, cy), []).append(i)
+        if len(self._edges):
+            left, top = self._boxes[:, :2].min(0)
+            right, bottom = self._boxes[:, 2:].max(0)
+            self._rect = QRectF(QPointF(left, top), QPointF(right, bottom))
+        else:
+            self._rect = QRectF()
+
+    def boundingRect(self) -> QRectF:
+        self.rebuild()
+        return self._rect
+
+    def paths(self):
+        '''a path per (color, width) for the hidden edges'''
+        if self._paths is None:
+            self.rebuild()
+            self._paths = {}
+            for e, (x0, y0, x3, y3) in zip(self._edges, self._ends.tolist()):  # type: ignore
+                if e.isVisible():
+                    continue
+                path = self._paths.setdefault((e._state['color'], e._state['width']), QPainterPath())
+                add_curve(path, x0, y0, x3, y3, e._state['protrusion'], e._state['style'])
+        return self._paths
+
+    def paint(self, painter: QPainter, option, widget):
+        scene = self.scene()
+        if scene is not None and scene.simplifies(option, painter):
+            painter.setRenderHint(QPainter.Antialiasing, False)
+        for (color, width), path in self.paths().items():
+            painter.setPen(get_pen(color, width))
+            painter.drawPath(path)
+
+    def edgesIn(self, rect: QRectF):
+        '''the edges whose bounding boxes intersect `rect` (in scene coordinates)'''
+        self.rebuild()
+        left, top = int(rect.left() // self.cell), int(rect.top() // self.cell)
+        right, bottom = int(rect.right() // self.cell), int(rect.bottom() // self.cell)
+        found = set()
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                found.update(self._grid.get((cx, cy), ()))
+        boxes = self._boxes
+        return [
+            self._edges[i] for i in sorted(found)
+            if boxes[i, 0] <= rect.right() and rect.left() <= boxes[i, 2] and boxes[i, 1] <= rect.bottom() and rect.top() <= boxes[i, 3]  # type: ignore
+        ]
+
+    def edgeAt(self, point: QPointF):
+        for edge in self.edgesIn(QRectF(point, point)):
+            if edge.shape().contains(edge.mapFromScene(point)):
+                return edge
+        return None
+
+    def contains(self, point: QPointF):
+        return self.edgeAt(self.mapToScene(point)) is not None
+
+    def select(self, path: QPainterPath):
+        '''select the edges that `path` (in scene coordinates) intersects, e.g., a rubber band'''
+        for edge in self.edgesIn(path.boundingRect()):
+            if edge.shape().intersects(edge.mapFromScene(path)):
+                edge.setVisible(True)
+                edge.setSelected(True)
+        self._paths = None
+        self.update()
+
+    def adopt(self, edge):
+        edge.setVisible(edge.isSelected() or edge is self._hovered)
+        self.invalidate()
+
+    def release(self, edge):
+        '''hide an edge again, unless it is still selected or under the mouse'''
+        if edge.isSelected() or edge is self._hovered:
+            return
+        edge.setVisible(False)
+        self._paths = None
+        self.update()
+
+    def hover(self, edge):
+        if edge is self._hovered:
+            return
+        old, self._hovered = self._hovered, edge
+        if old is not None:
+            self.release(old)
+        if edge is not None:
+            edge.setVisible(True)
+            self._paths = None
+            self.update()
+
+    def unhover(self, edge):
+        if edge is self._hovered:
+            self.hover(None)
+
+    def hoverEnterEvent(self, event):
+        self.hover(self.edgeAt(event.scenePos()))
+
+    def hoverMoveEvent(self, event):
+        self.hover(self.edgeAt(event.scenePos()))
+
+    def mousePressEvent(self, event):
+        edge = self.edgeAt(event.scenePos())
+        if edge is None:
+            event.ignore()
+            return
+        if not event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.scene().clearSelection()
+        edge.setVisible(True)
+        edge.setSelected(True)
+
+
 class Menu(QMenu):
     def __init__(self, item: Item):
         super().__init__()
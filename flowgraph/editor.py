@@ -1,26 +1,216 @@
 __all__ = 'View',
 
 from debug import debug
-from . import node, function, socket, edge, entry
-from .backend import Qt, QGraphicsView, QGraphicsScene, QPainter, QRectF, QWheelEvent, QFrame, QContextMenuEvent, QMenu, QApplication, QWidget, QTransform, populate_menu, QKeySequence, with_error_message, get_brush
-from .util import partial, ignore_args, get_static_object_from_state
+from . import node, function, socket, edge, trace, model
+from .backend import Qt, QGraphicsView, QGraphicsScene, QPainter, QPainterPath, QRectF, QWheelEvent, QFrame, QContextMenuEvent, QMenu, QApplication, QWidget, QTransform, QTimer, QFileDialog, populate_menu, QKeySequence, with_error_message, get_brush
+from .util import partial, ignore_args, get_static_object_from_state, new_id
 from .stateful import Stateful
+from .dag import Scheduler
+from time import perf_counter
+from contextlib import contextmanager
 from json import loads, dumps
 
 
 class Scene(QGraphicsScene, Stateful):
+    lod = 0.5  # the threshold for simplifying, once turned on (see setLevelOfDetail)
+
     def __init__(self):
         super().__init__()
-        self._state = {}
+        self._state = dict(
+            coalesce=dict(delay=None, max_wait=None),
+            evaluation='push',
+            timing=False,
+            derived=True,
+            lod=0,
+            batched=False,
+            virtual=False,
+        )
         self._dirty = False  # FIXME: something to keep track of whether the thing has been saved or not
         self._nodes = []
+        self._node_ids = {}
+        self._entry_ids = {}
+        self._recomputed = None
+        self._journal = None
+        self._layer = None
+        self._model = model.Graph()
+        self._scheduler = Scheduler(self.widgets, self.upstream, self.wanted)
 
     def drawBackground(self, painter: QPainter, rect: QRectF):
         super().drawBackground(painter, rect)
         painter.fillRect(rect, get_brush('#3f7f7f7f'))
 
     def nodes(self):
-        return self._nodes.copy()
+        '''the node items, in order (the list itself: do not modify it)'''
+        return self._nodes
+
+    def node(self, id):
+        return self._node_ids[id]
+
+    def entry(self, id):
+        return self._entry_ids[id]
+
+    def widgets(self):
+        return [ node.widget() for node in self._nodes ]
+
+    def model(self):
+        '''the structure of the graph, see `model.Graph`'''
+        return self._model
+
+    def upstream(self, widget):
+        return [ port.source.node.view for port in self._model.node(widget.id()).ports if port.source is not None ]
+
+    def scheduler(self):
+        return self._scheduler
+
+    def evaluation(self):
+        return self._state['evaluation']
+
+    def setEvaluation(self, mode):
+        ''''push': evaluate whatever an input change affects (the default)
+        'pull': only evaluate what the nodes visible in a view need; the rest
+                stays stale until it is scrolled into view or `demand`ed
+        '''
+        if mode not in ('push', 'pull'):
+            raise ValueError(f"{mode=} must be 'push' or 'pull'")
+        self._state['evaluation'] = mode
+        self.refresh()
+
+    def wanted(self):
+        if self.evaluation() == 'push':
+            return None
+        return { item.widget() for item in self.visibleNodes() }
+
+    def visibleNodes(self):
+        '''the node items that some view shows (at least partly)'''
+        visible = set()
+        for view in self.views():
+            rect = view.mapToScene(view.viewport().rect()).boundingRect()
+            visible.update(item for item in self.items(rect) if isinstance(item, node.Item))
+        return visible
+
+    def virtualizes(self):
+        return self._state['virtual']
+
+    def setVirtualizes(self, value=True):
+        '''recycle the views of entries that scroll out of sight (see `entry.Virtual`),
+        so that only the nodes on screen hold them
+        '''
+        self._state['virtual'] = value
+        self.virtualize()
+
+    def virtualize(self):
+        if not self.virtualizes():
+            return
+        visible = self.visibleNodes()
+        for item in self._nodes:
+            if item not in visible:
+                item.widget().detach()
+
+    def demand(self, widgets):
+        self._scheduler.demand(widgets)
+        self.update()
+
+    def refresh(self):
+        self._scheduler.run()
+        self.update()
+
+    def savesDerived(self):
+        return self._state['derived']
+
+    def setSavesDerived(self, value=True):
+        '''with False, files only keep the values that cannot be recomputed (see
+        `Entry.derived`); the rest is recomputed once when they are opened
+        '''
+        self._state['derived'] = value
+
+    def evaluate(self):
+        '''evaluate every function node (once, in topological order)'''
+        with self._scheduler.deferred():
+            for widget in self.widgets():
+                if isinstance(widget, function.Widget):
+                    self._scheduler.request(widget)
+
+    @contextmanager
+    def transaction(self):
+        '''make many edits (e.g., adding nodes and edges) as one
+
+        Inside, the nodes that the edits affect are only marked for evaluation;
+        on the way out, each of them is evaluated once, upstream nodes first
+        (rather than every edge re-running everything downstream of it). Values
+        still pass along the edges as they are made, but no further than the
+        node they enter. Transactions nest; the outermost one evaluates. If an
+        edit raises, nothing is evaluated until the next change.
+        '''
+        with self._scheduler.deferred():
+            yield self
+        self.update()
+
+    def recomputed(self):
+        '''how long recomputing the values that were not saved took on load (or None)'''
+        return self._recomputed
+
+    def journal(self):
+        return self._journal
+
+    def setJournal(self, journal):
+        '''the `journal.Journal` to tell about changes (or None)'''
+        self._journal = journal
+
+    def record(self, op, key=None, **fields):
+        if self._journal is not None:
+            self._journal.record(op, key, **fields)
+
+    def timingOverlay(self):
+        return self._state['timing']
+
+    def setTimingOverlay(self, value=True):
+        '''show how long each node took to evaluate, see `node.Item.paintBadge`'''
+        for item in self._nodes:
+            item.prepareGeometryChange()
+        self._state['timing'] = value
+        self.update()
+
+    def levelOfDetail(self):
+        return self._state['lod']
+
+    def setLevelOfDetail(self, threshold=lod):
+        '''below this zoom (see `QStyleOptionGraphicsItem.levelOfDetailFromTransform`),
+        nodes are drawn as boxes with their names instead of their widgets, and
+        edges without antialiasing; 0 (the default) always draws everything
+        '''
+        self._state['lod'] = threshold
+        self.update()
+
+    def simplifies(self, option, painter):
+        '''whether to draw an item in less detail, see `setLevelOfDetail`'''
+        return option.levelOfDetailFromTransform(painter.worldTransform()) < self._state['lod']
+
+    def batchesEdges(self):
+        return self._state['batched']
+
+    def setBatchesEdges(self, value=True):
+        '''draw all edges from one `edge.Layer`, rather than as an item each (for large graphs)'''
+        self._state['batched'] = value
+        if value and self._layer is None:
+            self._layer = edge.Layer()
+            self.addItem(self._layer)
+            for item in self.edges():
+                self._layer.adopt(item)
+        elif not value and self._layer is not None:
+            layer, self._layer = self._layer, None
+            self.removeItem(layer)
+            for item in self.edges():
+                item.setVisible(True)
+
+    def edgeLayer(self):
+        return self._layer
+
+    def coalescing(self):
+        return self._state['coalesce']
+
+    def setCoalescing(self, delay=None, max_wait=None):
+        '''the default for entries that do not set their own, see `entry.Coalescing`'''
+        self._state['coalesce'] = dict(delay=delay, max_wait=max_wait)
 
     def findEntry(self, entry_or_socket):
         if isinstance(entry_or_socket, socket.Item):
@@ -28,70 +218,83 @@ class Scene(QGraphicsScene, Stateful):
         else:
             entry = entry_or_socket
 
-        nodes = self.nodes()
-        for n, node in enumerate(nodes):
-            entries = node.widget().entries()
-            for e, entry_ in enumerate(entries):
-                if entry_ is entry:
-                    return n, e
-        raise ValueError(entry)
-
-    def edges(self, with_indices=False):
-        nodes = self.nodes()
-        for n, node in enumerate(nodes):
-            entries = node.widget().entries()
-            for e, entry in enumerate(entries):
-                edge = entry.input().edge()
+        widget = entry.parent()
+        return self._nodes.index(widget.item()), widget.entries().index(entry)
+
+    def edges(self, with_indices=False, with_ids=False):
+        '''the edges, or (source, sink, edge) with the entries as indices or IDs'''
+        for n, item in enumerate(self._nodes):
+            for e, sink in enumerate(item.widget().entries()):
+                edge = sink.input().edge()
                 if edge is None:
                     continue
-                if not with_indices:
+                if with_ids:
+                    yield edge.source().entry().id(), sink.id(), edge
+                elif with_indices:
+                    yield self.findEntry(edge.source()), (n, e), edge
+                else:
                     yield edge
-                    continue
-                sink_idx = n, e
-                source = edge.source()
-                source_idx = self.findEntry(source)
-                yield source_idx, sink_idx, edge
 
     def addEdge(self, source, sink):
-        if isinstance(source, list | tuple):
-            n, e = source
-            source = self.nodes()[n].widget().entries()[e]
-        if isinstance(sink, list | tuple):
-            n, e = sink
-            sink = self.nodes()[n].widget().entries()[e]
-        #if isinstance(source, entry.Entry):
-        #    source = source.output()
-        #if isinstance(sink, entry.Entry):
-        #    sink = sink.input()
-        sink.setSource(source)
+        '''connect two entries, given as entries, IDs or (node, entry) indices'''
+        sink = self.resolveEntry(sink)
+        sink.setSource(self.resolveEntry(source))
+
+    def resolveEntry(self, key):
+        if isinstance(key, str):
+            return self._entry_ids[key]
+        if isinstance(key, list | tuple):
+            n, e = key
+            return self._nodes[n].widget().entries()[e]
+        return key
 
     def iterState(self):
         yield from Stateful.iterState(self)
-        yield 'nodes', [ node.state() for node in self.nodes() ]
-        yield 'edges', [
-            dict(source=source, sink=sink)
-            for source, sink, edge in self.edges(with_indices=True)
-        ]
+        yield 'nodes', iter(self.nodes())
+        yield 'edges', (dict(source=source, sink=sink) for source, sink in self._model.edges())
 
     def addState(self, state):
-        for key, value in (state.items() if isinstance(state, dict) else state):
-            if key in self._state:
-                self._state[key] = value
-            elif key == 'nodes':
-                for node_state in value:
-                    Node = get_static_object_from_state(node_state)
-                    node = Node.fromState(node_state)
-                    self.addNode(node)
-            elif key == 'edges':
-                for edge in value:
-                    self.addEdge(edge['source'], edge['sink'])
-            else:
-                raise KeyError(f'{repr(key)}: {repr(value)}')
+        '''add nodes and edges, in a `transaction`; IDs that are taken (e.g., when pasting) are replaced'''
+        ids = {}
+        with self.transaction():
+            for key, value in (state.items() if isinstance(state, dict) else state):
+                if key in self._state:
+                    self._state[key] = value
+                elif key == 'nodes':
+                    for node_state in value:
+                        Node = get_static_object_from_state(node_state)
+                        node = Node.fromState(node_state)
+                        widget = node.widget()
+                        old = [ e.id() for e in widget.entries() ]
+                        self.addNode(node)
+                        ids.update(zip(old, (e.id() for e in widget.entries())))
+                elif key == 'edges':
+                    for edge in value:
+                        source, sink = edge['source'], edge['sink']
+                        if isinstance(source, str):
+                            source, sink = ids.get(source, source), ids.get(sink, sink)
+                        self.addEdge(source, sink)
+                else:
+                    raise KeyError(f'{repr(key)}: {repr(value)}')
+        self.setBatchesEdges(self.batchesEdges())
 
     def setState(self, state):
         state = super().setState(state, missing='return')
-        self.removeAll()
-        self.addState(state)
+        journal, self._journal = self._journal, None  # a new state is not a change
+        try:
+            self.removeAll()
+            self._recomputed = None
+            if self.savesDerived():
+                self.addState(state)
+                return
+            with self.transaction():
+                self.addState(state)
+                self._scheduler.clear()
+            start = perf_counter()
+            self.evaluate()
+            self._recomputed = perf_counter() - start
+        finally:
+            self._journal = journal
 
     def addNode(self, widget_or_item, pos=None):
         item = node.Item(widget_or_item) if isinstance(widget_or_item, QWidget) else widget_or_item
@@ -99,13 +302,58 @@ class Scene(QGraphicsScene, Stateful):
             item.setPos(pos)
         self.addItem(item)
         self._nodes.append(item)
+        widget = item.widget()
+        if widget.id() in self._node_ids:
+            widget.setId(new_id())
+        self._node_ids[widget.id()] = item
+        self._model.addNode(widget.id(), widget)
+        for e in widget.entries():
+            self.registerEntry(e)
+        for e in widget.entries():  # edges made before the node was added
+            self.linkEntry(e)
+        self.record('node', item=item)
         return item
 
+    def registerEntry(self, entry):
+        if entry.id() in self._entry_ids and self._entry_ids[entry.id()] is not entry:
+            entry.setId(new_id())
+        self._entry_ids[entry.id()] = entry
+        if self._model.port(entry.id()) is None:
+            self._model.addPort(entry.parent().id(), entry.id(), entry)
+            entry.connectCallback(entry.recordValue)
+
+    def linkEntry(self, entry):
+        '''put the entry's edges (made outside the scene) in the model'''
+        port = self._model.port(entry.id())
+        if entry.source is not None and self._model.port(entry.source.id()) is not None:
+            port.setSource(self._model.port(entry.source.id()))
+        for item in entry.output().edges():
+            sink = self._model.port(item.sink().entry().id())
+            if sink is not None:
+                sink.setSource(port)
+
+    def unregisterEntry(self, entry):
+        self._entry_ids.pop(entry.id(), None)
+        if self._model.port(entry.id()) is not None:
+            self._model.removePort(entry.id())
+            entry.disconnectCallback(entry.recordValue)
+
     def removeNode(self, node):
         if isinstance(node, int):
-            return self.removeItem(self.nodes().pop(node))
+            node = self._nodes[node]
         self._nodes.remove(node)
+        widget = node.widget()
+        del self._node_ids[widget.id()]
+        for port in self._model.node(widget.id()).ports:
+            for sink in list(port.sinks):
+                self.removeEdge(sink.view.input().edge())
+        for e in widget.entries():
+            if e.input().edge() is not None:  # unsets the source, so it stops receiving
+                self.removeEdge(e.input().edge())
+            self.unregisterEntry(e)
+        self._model.removeNode(widget.id())
         self.removeItem(node)
+        self.record('remove', id=widget.id())
 
     def removeEdge(self, edge):
         # FIXME: by index?
@@ -115,6 +363,9 @@ class Scene(QGraphicsScene, Stateful):
     def editor(self):
         return self.views()[0]
 
+    def selectedWidgets(self):
+        return [ item.widget() for item in self.selectedNodes() ]
+
     def selectedNodes(self):
         return [ i for i in self.selectedItems() if isinstance(i, node.Item) ]
 
@@ -129,8 +380,8 @@ class Scene(QGraphicsScene, Stateful):
                 self.removeEdge(item)
 
     def removeAll(self):
-        for node in self.nodes():
-            self.removeNode(node)
+        for item in list(self._nodes):
+            self.removeNode(item)
 
     def selectedToClipboard(self):
         clipboard = QApplication.instance().clipboard()  # type: ignore
@@ -154,6 +405,8 @@ class Scene(QGraphicsScene, Stateful):
 
 
 class View(QGraphicsView, Stateful):
+    recycle_delay = 100  # ms after scrolling or zooming, see `Scene.virtualize`
+
     def __init__(self):
         super().__init__()
         self.setScene(Scene())
@@ -163,7 +416,7 @@ class View(QGraphicsView, Stateful):
         )
         #self._mouse_press = None
 
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
         self.setRenderHints(QPainter.Antialiasing | QPainter.HighQualityAntialiasing |
                             QPainter.TextAntialiasing | QPainter.SmoothPixmapTransform)
 
@@ -177,16 +430,13 @@ class View(QGraphicsView, Stateful):
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.DefaultContextMenu)
         self.functions = []
 
-        self._entry_types: dict[str, entry.Entry] = {
-            name: attr
-            for name, attr in vars(entry).items()
-            if isinstance(attr, type) and issubclass(attr, entry.Entry) and attr is not entry.Entry
-        }
-
-    def registerEntryType(self, Entry):
-        if not isinstance(Entry, entry.Entry):
-            raise ValueError(f'{Entry=} must be a subclass of entry.Entry')
-        self._entry_types[Entry.__name__] = Entry
+        self._refresh = QTimer(self)
+        self._refresh.setSingleShot(True)
+        self._refresh.timeout.connect(lambda: self.scene().refresh())
+        self._virtualize = QTimer(self)
+        self._virtualize.setSingleShot(True)
+        self._virtualize.timeout.connect(lambda: self.scene().virtualize())
+        self.rubberBandChanged.connect(self.selectEdgesIn)
 
     def scene(self) -> Scene:
         scene = super().scene()
@@ -208,11 +458,36 @@ class View(QGraphicsView, Stateful):
             if event.angleDelta().y() < 0:
                 incr = 1 / incr
             self.scale(incr, incr)
+            self.viewportChanged()
         else:
             super().wheelEvent(event)
 
+    def viewportChanged(self):
+        scene = super().scene()  # None while being torn down
+        if isinstance(scene, Scene) and scene.evaluation() == 'pull':
+            self._refresh.start(0)
+        if isinstance(scene, Scene) and scene.virtualizes():
+            self._virtualize.start(self.recycle_delay)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.viewportChanged()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewportChanged()
+
+    def selectEdgesIn(self, rect, start, end):
+        layer = self.scene().edgeLayer()
+        if layer is not None and not rect.isNull():  # null when the rubber band is released
+            path = QPainterPath()
+            path.addPolygon(self.mapToScene(rect))
+            layer.select(path)
+
     def contextMenuEvent(self, event: QContextMenuEvent) -> None:
         item = self.itemAt(event.x(), event.y())
+        if isinstance(item, edge.Layer):
+            item = item.edgeAt(self.mapToScene(event.pos()))
         if item is None:
             Menu(self, event).exec(event.globalPos())
             return
@@ -229,7 +504,7 @@ class View(QGraphicsView, Stateful):
     def iterState(self):
         yield from Stateful.iterState(self)
         yield 'transform', self.transformAsList()
-        yield 'scene', self.scene().state()
+        yield 'scene', self.scene()
 
     def setState(self, state):
         state = super().setState(state, missing='return')
@@ -238,6 +513,7 @@ class View(QGraphicsView, Stateful):
                 pass
             elif key == 'transform':
                 self.setTransform(QTransform(*value))
+                self.viewportChanged()
             elif key == 'scene':
                 self.scene().setState(value)
             else:
@@ -250,6 +526,16 @@ def add_function(view, f, pos):
     return view.addNode(function.Widget(f), pos)
 
 
+def toggle_tracing(view, on):
+    if on:
+        trace.start()
+        return
+    tracer = trace.stop()
+    path, filter = QFileDialog.getSaveFileName(view, 'Save Trace', '', 'Trace Event Files (*.json)')
+    if tracer is not None and path:
+        tracer.save(path)
+
+
 class Menu(QMenu):
     def __init__(self, view: View, event: QContextMenuEvent | None = None):
         super().__init__()
@@ -260,7 +546,44 @@ class Menu(QMenu):
             action = add.addAction(f'&{f.__name__}')
             assert action is not None
             action.triggered.connect(ignore_args(partial(add_function, view, f, pos)))
+        scene = view.scene()
         populate_menu(self, [
-            ('&Delete', 'Delete'         , view.scene().removeSelected     ),
-            ('&Copy'  , QKeySequence.Copy, view.scene().selectedToClipboard),
+            ('&Delete'           , 'Delete'         , scene.removeSelected     ),
+            ('&Copy'             , QKeySequence.Copy, scene.selectedToClipboard),
+            ('&Evaluate Selected', 'F5'             , ignore_args(lambda: scene.demand(scene.selectedWidgets()))),
         ])
+        pull = self.addAction('&Pull Evaluation')
+        assert pull is not None
+        pull.setCheckable(True)
+        pull.setChecked(scene.evaluation() == 'pull')
+        pull.toggled.connect(lambda checked: scene.setEvaluation('pull' if checked else 'push'))
+        timing = self.addAction('&Timing Overlay')
+        assert timing is not None
+        timing.setCheckable(True)
+        timing.setChecked(scene.timingOverlay())
+        timing.toggled.connect(scene.setTimingOverlay)
+        simple = self.addAction('&Simplify When Zoomed Out')
+        assert simple is not None
+        simple.setCheckable(True)
+        simple.setChecked(scene.levelOfDetail() > 0)
+        simple.toggled.connect(lambda checked: scene.setLevelOfDetail(Scene.lod if checked else 0))
+        virtual = self.addAction('&Virtualize Widgets')
+        assert virtual is not None
+        virtual.setCheckable(True)
+        virtual.setChecked(scene.virtualizes())
+        virtual.toggled.connect(scene.setVirtualizes)
+        batched = self.addAction('&Batch Edges')
+        assert batched is not None
+        batched.setCheckable(True)
+        batched.setChecked(scene.batchesEdges())
+        batched.toggled.connect(scene.setBatchesEdges)
+        derived = self.addAction('Save &Derived Values')
+        assert derived is not None
+        derived.setCheckable(True)
+        derived.setChecked(scene.savesDerived())
+        derived.toggled.connect(scene.setSavesDerived)
+        tracing = self.addAction('T&race Propagation')
+        assert tracing is not None
+        tracing.setCheckable(True)
+        tracing.setChecked(trace.active() is not None)
+        tracing.toggled.connect(with_error_message(partial(toggle_tracing, view)))
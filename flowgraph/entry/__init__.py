@@ -1,7 +1,10 @@
-__all__ = 'Str', 'Int', 'Float', 'Entry', 'Generic', 'Button', 'ToggleButton', 'Plot'
+__all__ = 'Str', 'Int', 'Float', 'Entry', 'Coalescing', 'Generic', 'Button', 'ToggleButton', 'Virtual', 'Plot'
+
+from importlib import import_module
 
 from .entry import Entry
 from .number import Number
+from .coalesce import Coalescing
 
 from .generic import Generic
 from .str import Str
@@ -10,6 +13,15 @@ from .int import Int
 from .float import Float
 from .bool import Bool
 from .button import Button, ToggleButton
-from .plot import Plot
-from .scatter import Scatter
-from .contour import Contour
+from .virtual import Virtual
+
+# these need pyqtgraph, pandas and matplotlib, which take a while to import,
+# so they are only imported when asked for (a saved state names the module)
+_modules = dict(Plot='.plot', Scatter='.scatter', Contour='.contour')
+
+
+def __getattr__(name):
+    if name in _modules:
+        value = globals()[name] = getattr(import_module(_modules[name], __name__), name)
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,89 @@
+__all__ = 'Coalescing',
+
+from ..backend import QObject, QTimer, pyqtSignal
+from .entry import Entry
+from time import monotonic
+
+
+class Coalescer(QObject):
+    fired = pyqtSignal(object)
+
+    def __init__(self, entry):
+        super().__init__(entry)
+        self._entry = entry
+        self._value = None
+        self._since = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def push(self, value):
+        config = self._entry.coalescing()
+        delay, max_wait = config['delay'], config['max_wait']
+        if self._entry.isReadOnly() or (not delay and not max_wait):
+            return self.fired.emit(value)
+
+        now = monotonic()
+        if self._since is None:
+            self._since = now
+        self._value = value
+
+        wait = delay if delay else max_wait
+        if max_wait:
+            wait = min(wait, max(0, max_wait - 1000 * (now - self._since)))
+        self._timer.start(int(wait))
+
+    def flush(self):
+        if self._since is None:
+            return
+        self._since = None
+        self.fired.emit(self._value)
+
+
+class Coalescing(Entry):
+    '''an entry whose callbacks see a burst of edits as a single change
+
+    The callbacks run once the entry has been quiet for `delay` ms, but no
+    later than `max_wait` ms after the first edit of the burst, always with
+    the latest value. Either may be None; with both None (the default),
+    every edit is passed on immediately. When the entry does not configure
+    this, the scene's setting applies. Read-only entries (i.e., ones fed by
+    an edge or holding a result) pass their changes on immediately.
+    '''
+
+    def __init__(self, name=None, callback=None, default=None):
+        if not hasattr(self, '_coalescer'):  # Qt's __init__ may already have called us
+            self._coalescer = Coalescer(self)
+            self.changed().connect(self._coalescer.push)
+        super().__init__(name, callback, default)
+        self._state['coalesce'] = None
+
+    def changed(self):
+        raise NotImplementedError(type(self))
+
+    def isReadOnly(self):
+        raise NotImplementedError(type(self))
+
+    def coalescing(self):
+        if self._state.get('coalesce') is not None:
+            return self._state['coalesce']
+        parent = self.parent()
+        scene = parent.scene() if hasattr(parent, 'scene') else None
+        if scene is not None and hasattr(scene, 'coalescing'):
+            return scene.coalescing()
+        return dict(delay=None, max_wait=None)
+
+    def setCoalescing(self, delay=None, max_wait=None):
+        self._state['coalesce'] = dict(delay=delay, max_wait=max_wait)
+
+    def unsetCoalescing(self):
+        self._state['coalesce'] = None
+
+    def flush(self):
+        self._coalescer.flush()
+
+    def connectCallback(self, callback):
+        self._coalescer.fired.connect(callback)
+
+    def disconnectCallback(self, callback):
+        self._coalescer.fired.disconnect(callback)
@@ -28,11 +28,9 @@ class Combo(QComboBox, Entry):
         self.setValue(value)
         self.blockSignals(prev)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
+    def connectCallback(self, callback):
         self.currentTextChanged.connect(callback)
 
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
+    def disconnectCallback(self, callback):
         self.currentTextChanged.disconnect(callback)
 
@@ -1,47 +1,26 @@
 __all__ = 'Contour',
 
-from .entry import Entry
-from ..backend import pyqtSignal
-from pyqtgraph import PlotWidget, ScatterPlotItem, ImageView
+from .virtual import Virtual
+from ..backend import QSizePolicy
 from pyqtgraph.widgets.MatplotlibWidget import MatplotlibWidget
 import matplotlib.pyplot as plt
 from debug import debug
 from pandas import DataFrame
 
 
-class Contour(MatplotlibWidget, Entry):
-    valueChanged = pyqtSignal(object)
+class Contour(Virtual):
+    size_hint = 372, 330
+    minimum_size_hint = 76, 78
+    size_policy = QSizePolicy.Policy.Preferred
 
-    def __init__(self, name=None, callback=None, default=None):
-        super().__init__()
+    def createView(self):
+        view = MatplotlibWidget()
+        view.getFigure().set_size_inches(3.5, 3.5 * 3 / 4)
+        #view.enableMouse()
+        return view
 
-        fig = self.getFigure()
-        fig.set_size_inches(3.5, 3.5 * 3 / 4)
-
-        #self.enableMouse()
-        Entry.__init__(self, name, callback, default)
-
-    def setReadOnly(self, value):
-        pass
-
-    def setName(self, name):
-        super().setName(name)
-        #self.setPlaceholderText(name)
-
-    def value(self):
-        return self._value
-
-    def setValue(self, value):
-        self.setValueSilently(value)
-        self.valueChanged.emit(value)
-
-    def setValueSilently(self, value):
-        if value is None:
-            return
-
-        self._value = value
-
-        fig = self.getFigure()
+    def draw(self, view, value):
+        fig = view.getFigure()
         fig.clf()
         ax = fig.add_subplot(111)
 
@@ -59,14 +38,9 @@ class Contour(MatplotlibWidget, Entry):
 
         ax.add_artist(plt.Circle((0, 0), 1, fill=False, color='gray'))
 
-        self.canvas.draw()
-        self.canvas.flush_events()
-
-    def addCallback(self, callback):
-        super().addCallback(callback)
-        self.valueChanged.connect(callback)
-
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
-        self.valueChanged.disconnect(callback)
+        view.canvas.draw()
+        view.canvas.flush_events()
 
+    def clear(self, view):
+        view.getFigure().clf()
+        view.canvas.draw()
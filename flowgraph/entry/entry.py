@@ -1,19 +1,23 @@
 __all__ = 'Entry',
 
 from debug import debug
-from .. import socket
-from ..util import object_state, get_object_from_state
+from .. import socket, trace, store
+from ..util import object_state, get_object_from_state, new_id
 from ..stateful import Stateful
-from dill import loads, dumps
-from base64 import b64decode, b64encode
+from ..fingerprint import Fingerprint
 
 
 class Entry(Stateful):
+    lazy = False  # keep saved values encoded until they are needed, see `resolve`
+
     def __init__(self, name=None, callback=None, default=None):
         super().__init__()
         self._callbacks = []
         self._input, self._output = socket.Input(self), socket.Output(self)
         self._parentItem = None
+        self._seen = None
+        self._handle = None
+        self._id = new_id()
         self.source = None
         self.setName(name)
 
@@ -37,6 +41,12 @@ class Entry(Stateful):
         self._output.setParentItem(item)
         return self
 
+    def id(self):
+        return self._id
+
+    def setId(self, id):
+        self._id = id
+
     def name(self):
         return self._name
 
@@ -59,25 +69,96 @@ class Entry(Stateful):
     def setValueSilently(self, value):
         raise NotImplementedError(type(self))
 
+    def resolve(self):
+        '''decode the loaded value, if that has not happened yet
+
+        Lazy entries call this from `value()`; nodes call it when they are
+        painted. Setting a value drops the loaded one.
+        '''
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            self.setValueSilently(handle.resolve())
+
+    def attach(self):
+        '''create the entry's view, if it is only created while on screen (see `Virtual`)'''
+
+    def detach(self):
+        '''drop the view again, see `attach`'''
+
+    def differs(self, value):
+        '''whether `value` differs from the current one, see `Fingerprint`
+
+        returns the new value's Fingerprint if it does, None if not
+        '''
+        current = self.value()
+        if self._seen is None or self._seen.value is not current:
+            self._seen = Fingerprint(current)
+        new = Fingerprint(value)
+        return None if self._seen.matches(new) else new
+
     def setValueIfDifferent(self, value):
-        if self.value() != value:
+        new = self.differs(value)
+        if new is not None:
+            with trace.span(self.name() or '', 'setValue'):
+                self.setValue(value)
+            self._seen = new
+
+    def receive(self, value):
+        '''the callback through which an edge passes its source's value on'''
+        with trace.span(self.name() or '', 'setValue', edge=True):
             self.setValue(value)
 
     def setValueSilentlyIfDifferent(self, value):
-        if self.value() != value:
+        new = self.differs(value)
+        if new is not None:
             self.setValueSilently(value)
+            self._seen = new
 
     def parent(self):
         raise NotImplementedError(type(self))
 
+    def editorScene(self):
+        '''the `editor.Scene` of the entry's node (or None)'''
+        parent = self.parent()
+        return parent.scene() if parent is not None else None
+
+    def port(self):
+        '''the entry in the scene's `model.Graph` (or None)'''
+        scene = self.editorScene()
+        return scene.model().port(self.id()) if scene is not None else None
+
+    def journal(self, op, key=None, **fields):
+        '''tell the scene's journal (if any) about a change, see `editor.Scene.record`'''
+        scene = self.editorScene()
+        if scene is not None:
+            scene.record(op, key, **fields)
+
+    def recordValue(self, value):
+        '''journal values set by hand (derived ones follow from those); see `editor.Scene.registerEntry`'''
+        if not self.derived():
+            self.journal('value', self.id(), entry=self)
+
+    def derived(self):
+        '''whether the value follows from others: it comes through an edge or is a result'''
+        parent = self.parent()
+        return self.source is not None or (parent is not None and parent.derives(self))
+
     def setParent(self, value):
         raise NotImplementedError(type(self))
 
     def addCallback(self, callback):
         self._callbacks.append(callback)
+        self.connectCallback(callback)
 
     def removeCallback(self, callback):
         self._callbacks.remove(callback)
+        self.disconnectCallback(callback)
+
+    def connectCallback(self, callback):
+        '''call `callback(value)` when the value changes, without adding it to the (saved) callbacks'''
+
+    def disconnectCallback(self, callback):
+        pass
 
     def callbacks(self):
         return self._callbacks.copy()
@@ -88,42 +169,65 @@ class Entry(Stateful):
 
     def setSource(self, source):
         self.unsetSource()
-        self.setValue(source.value())
+        if self._handle is None or source._handle is None:  # two loaded values already agree
+            self.setValue(source.value())
         self.input().setSource(source.output())
         self.source = source
-        source.addCallback(self.setValue)
+        port, source_port = self.port(), source.port()
+        if port is not None and source_port is not None:
+            port.setSource(source_port)
+        source.addCallback(self.receive)
         self.setReadOnly(True)
+        self.journal('edge', source=source.id(), sink=self.id())
 
     def unsetSource(self):
         self.input().unsetSource()
         if self.source is not None:
-            self.source.removeCallback(self.setValue)
+            self.source.removeCallback(self.receive)
             self.source = None
+            port = self.port()
+            if port is not None:
+                port.setSource(None)
+            self.journal('unedge', sink=self.id())
         self.setReadOnly(False)
 
     def iterState(self):
         yield from super().iterState()
+        yield 'id', self.id()
         if self.name() is not None:
             yield 'name', self.name()
-        yield 'input', self.input().state()
-        yield 'output', self.output().state()
-        if self.value() is not None:
-            yield 'value', b64encode(dumps(self.value())).decode()
-        yield 'callbacks', [ object_state(callback) for callback in self.callbacks() ]
+        yield 'input', self.input()
+        yield 'output', self.output()
+        if not store.keeps(self):
+            if self._handle is not None:
+                store.carry(self._handle)
+        elif self._handle is not None:
+            yield 'value', self._handle.encode()
+        elif self.value() is not None:
+            yield 'value', store.encode(self.value())
+        yield 'callbacks', [
+            object_state(callback)
+            for callback in self.callbacks()
+            if not isinstance(getattr(callback, '__self__', None), Entry)  # edges restore these
+        ]
 
     def setState(self, state, parent=None, missing='error'):
         state = super().setState(state, missing='return')
         assert isinstance(state, dict)
         rv = {} if missing == 'return' else None
         for key, value in state.items():
-            if key == 'name':
+            if key == 'id':
+                self.setId(value)
+            elif key == 'name':
                 self.setName(value)
             elif key == 'input':
                 self.input().setState(value)
             elif key == 'output':
                 self.output().setState(value)
+            elif key == 'value' and self.lazy:
+                self._handle = store.handle(value)
             elif key == 'value':
-                self.setValue(loads(b64decode(value)))
+                self.setValue(store.decode(value))
             elif key == 'callbacks':
                 for callback_state in value:
                     try:
@@ -6,6 +6,7 @@ from debug import debug
 
 
 class Generic(QTextEdit, Entry):
+    lazy = True
     valueChanged = pyqtSignal(object)
 
     def __init__(self, name=None, callback=None, default=None):
@@ -21,6 +22,7 @@ class Generic(QTextEdit, Entry):
         self.setPlaceholderText(name)
 
     def value(self):
+        self.resolve()
         return self._value
 
     def setValue(self, value):
@@ -28,17 +30,16 @@ class Generic(QTextEdit, Entry):
         self.valueChanged.emit(value)
 
     def setValueSilently(self, value):
+        self._handle = None
         self._value = value
         prev = self.blockSignals(True)
         self.setText(str(value) if value is not None else '')
         self.blockSignals(prev)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
+    def connectCallback(self, callback):
         self.valueChanged.connect(callback)
 
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
+    def disconnectCallback(self, callback):
         self.valueChanged.disconnect(callback)
 
     def setReadOnly(self, value=True):
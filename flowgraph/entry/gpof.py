@@ -49,6 +49,7 @@ class Gpof(PlotWidget, Entry):
 
     def __init__(self, name=None, callback=None, default=None):
         super().__init__()
+        self._value = None
         #self.enableMouse()
         Entry.__init__(self, name, callback, default)
         self.traces = []
@@ -83,10 +84,8 @@ class Gpof(PlotWidget, Entry):
             y = value[column].to_numpy()
             trace.setData(x, y)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
+    def connectCallback(self, callback):
         self.valueChanged.connect(callback)
 
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
+    def disconnectCallback(self, callback):
         self.valueChanged.disconnect(callback)
@@ -1,9 +1,9 @@
 __all__ = 'Number',
 
-from .entry import Entry
+from .coalesce import Coalescing
 
 
-class Number(Entry):
+class Number(Coalescing):
     def __init__(self, name=None, callback=None, default: int | float = 0, start=None, stop=None, step=None):
         if start is not None:
             self.setMinimum(start)
@@ -26,13 +26,8 @@ class Number(Entry):
         self.setValue(value)
         self.blockSignals(prev)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
-        self.valueChanged.connect(callback)
-
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
-        self.valueChanged.disconnect(callback)
+    def changed(self):
+        return self.valueChanged
 
     def iterState(self):
         yield from super().iterState()
@@ -1,42 +1,17 @@
 __all__ = 'Scatter',
 
-from .entry import Entry
-from ..backend import pyqtSignal
+from .virtual import Virtual
 from pyqtgraph import PlotWidget, ScatterPlotItem
 from debug import debug
 from pandas import DataFrame
 import numpy as np
 
 
-class Scatter(PlotWidget, Entry):
-    valueChanged = pyqtSignal(object)
-
-    def __init__(self, name=None, callback=None, default=None):
-        super().__init__()
-        #self.enableMouse()
-        Entry.__init__(self, name, callback, default)
-        self.traces = []
-
-    def setReadOnly(self, value):
-        pass
-
-    def setName(self, name):
-        super().setName(name)
-        #self.setPlaceholderText(name)
-
-    def value(self):
-        return self._value
-
-    def setValue(self, value):
-        self.setValueSilently(value)
-        self.valueChanged.emit(value)
-
-    def setValueSilently(self, value):
-        if value is None:
-            return
-
-        self._value = value
+class Scatter(Virtual):
+    def createView(self):
+        return PlotWidget()
 
+    def draw(self, view, value):
         if isinstance(value, np.ndarray):
             if value.dtype == complex:
                 x, y = value.real, value.imag
@@ -47,22 +22,18 @@ class Scatter(PlotWidget, Entry):
             x = value.index.to_numpy()
             y = value[col].to_numpy()
 
+        traces = view.listDataItems()
         n = 1
-        while len(self.traces) < n:
+        while len(traces) < n:
             item = ScatterPlotItem()
-            self.addItem(item)
-            self.traces.append(item)
+            view.addItem(item)
+            traces.append(item)
 
-        while len(self.traces) > n:
-            self.removeItem(self.traces.pop())
+        while len(traces) > n:
+            view.removeItem(traces.pop())
 
-        for trace in self.traces:
+        for trace in traces:
             trace.setData(x, y)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
-        self.valueChanged.connect(callback)
-
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
-        self.valueChanged.disconnect(callback)
+    def clear(self, view):
+        view.clear()
@@ -1,13 +1,13 @@
 __all__ = 'Str',
 
-from .entry import Entry
+from .coalesce import Coalescing
 from ..backend import QLineEdit
 
 
-class Str(QLineEdit, Entry):
+class Str(QLineEdit, Coalescing):
     def __init__(self, name=None, callback=None, default=''):
         super().__init__()
-        Entry.__init__(self, name, callback, default)
+        Coalescing.__init__(self, name, callback, default)
 
     def setName(self, name):
         super().setName(name)
@@ -24,10 +24,5 @@ class Str(QLineEdit, Entry):
         self.setValue(value)
         self.blockSignals(prev)
 
-    def addCallback(self, callback):
-        super().addCallback(callback)
-        self.textChanged.connect(callback)
-
-    def removeCallback(self, callback):
-        super().removeCallback(callback)
-        self.textChanged.disconnect(callback)
+    def changed(self):
+        return self.textChanged
@@ -0,0 +1,108 @@
+__all__ = 'Virtual',
+
+from .entry import Entry
+from ..backend import QWidget, QSize, QSizePolicy, pyqtSignal
+
+
+class Virtual(QWidget, Entry):
+    '''an entry whose (heavy) view is only created while its node is on screen
+
+    The entry itself is a light placeholder of the view's size that keeps the
+    value. `attach` puts a view in it, recycled from an earlier `detach` if
+    possible, and draws the value; nodes attach their entries when they are
+    painted, and `editor.Scene.virtualize` detaches those that scrolled away.
+
+    Subclasses implement `createView`, `draw` and `clear`.
+    '''
+    lazy = True
+    valueChanged = pyqtSignal(object)
+    size_hint = 600, 450
+    minimum_size_hint = 69, 69
+    size_policy = QSizePolicy.Policy.Expanding
+    spare = 8  # detached views kept for reuse, per class
+    _pools: dict[type, list] = {}
+
+    def __init__(self, name=None, callback=None, default=None):
+        super().__init__()
+        self._value = None
+        self._view = None
+        self.setSizePolicy(self.size_policy, self.size_policy)
+        Entry.__init__(self, name, callback, default)
+
+    def sizeHint(self):
+        return QSize(*self.size_hint)
+
+    def minimumSizeHint(self):
+        return QSize(*self.minimum_size_hint)
+
+    def createView(self):
+        raise NotImplementedError(type(self))
+
+    def draw(self, view, value):
+        raise NotImplementedError(type(self))
+
+    def clear(self, view):
+        raise NotImplementedError(type(self))
+
+    def view(self):
+        '''the view, if attached'''
+        return self._view
+
+    def attach(self):
+        if self._view is not None:
+            return
+        pool = self._pools.setdefault(type(self), [])
+        view = pool.pop() if pool else self.createView()
+        view.setParent(self)
+        view.setGeometry(self.rect())
+        view.show()
+        self._view = view
+        if self._value is not None:
+            self.draw(view, self._value)
+
+    def detach(self):
+        view, self._view = self._view, None
+        if view is None:
+            return
+        view.hide()
+        view.setParent(None)
+        pool = self._pools.setdefault(type(self), [])
+        if len(pool) < self.spare:
+            self.clear(view)
+            pool.append(view)
+        else:
+            view.deleteLater()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._view is not None:
+            self._view.setGeometry(self.rect())
+
+    def setReadOnly(self, value):
+        pass
+
+    def value(self):
+        self.resolve()
+        return self._value
+
+    def setValue(self, value):
+        self.setValueSilently(value)
+        self.valueChanged.emit(value)
+
+    def setValueSilently(self, value):
+        self._handle = None
+        if value is None:
+            return
+        self._value = value
+        if self._view is not None:
+            self.draw(self._view, value)
+
+    def connectCallback(self, callback):
+        self.valueChanged.connect(callback)
+
+    def disconnectCallback(self, callback):
+        self.valueChanged.disconnect(callback)
+
+    def remove(self):
+        self.detach()
+        super().remove()
@@ -0,0 +1,69 @@
+__all__ = 'submit',
+
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import cache
+from multiprocessing import resource_tracker
+from funcpipes import nothing
+from . import shm
+
+
+@cache
+def thread_pool():
+    return ThreadPoolExecutor(thread_name_prefix='flowgraph')
+
+
+@cache
+def process_pool():
+    # the workers must share our resource tracker, so that a block is tracked
+    # once no matter which side created or attached to it
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor()
+
+
+def call_shared(func, args):
+    '''run in a worker process: `args` and the results go through shared memory'''
+    blocks = []
+    try:
+        args = shm.unshare(args, blocks)
+        results = func(*args)
+        del args
+        if results is nothing:  # identity does not survive pickling
+            return False, None
+        created = []
+        shared = shm.share(results, created)
+        del results
+        shm.release(created)
+        return True, shared
+    finally:
+        shm.release(blocks)
+
+
+def submit_to_process(func, args):
+    blocks = []
+    inner = process_pool().submit(call_shared, func, shm.share(list(args), blocks))
+    outer = Future()
+    outer.add_done_callback(lambda outer: outer.cancelled() and inner.cancel())
+
+    def done(inner):
+        shm.release(blocks, unlink=True)
+        if inner.cancelled() or not outer.set_running_or_notify_cancel():
+            if not inner.cancelled() and inner.exception() is None:
+                shm.unshare(inner.result()[1], [], copy=True)  # just to unlink the blocks
+            return
+        try:
+            produced, results = inner.result()
+            outer.set_result(shm.unshare(results, [], copy=True) if produced else nothing)
+        except Exception as e:
+            outer.set_exception(e)
+
+    inner.add_done_callback(done)
+    return outer
+
+
+def submit(kind, func, *args):
+    '''start `func(*args)` in the pool `kind` names; returns a Future'''
+    if kind == 'thread':
+        return thread_pool().submit(func, *args)
+    if kind == 'process':
+        return submit_to_process(func, args)
+    raise ValueError(f"{kind=} must be 'thread' or 'process'")
@@ -0,0 +1,99 @@
+__all__ = 'digest', 'fingerprint', 'stamp', 'Fingerprint'
+
+from hashlib import blake2b
+from pickle import dumps, PicklingError
+import sys
+
+try:
+    from xxhash import xxh3_128_digest as _digest
+except ImportError:
+    def _digest(data):
+        return blake2b(data, digest_size=16).digest()
+
+
+def digest(data):
+    '''a short hash of a bytes-like object'''
+    return _digest(data)
+
+
+def _array(np, value):
+    if value.dtype.hasobject:
+        raise TypeError('object arrays have no stable buffer')
+    return 'ndarray', value.dtype.str, value.shape, digest(np.ascontiguousarray(value).view(np.uint8).reshape(-1))
+
+
+def fingerprint(value):
+    '''a cheap, hashable stand-in for `value`
+
+    Equal fingerprints mean equal values (up to hash collisions). Hashable
+    values stand for themselves (tagged with their type, so 1, 1.0 and True
+    differ); numpy arrays and pandas objects are hashed by content; anything
+    else is hashed through pickle. TypeError is raised if none of that works.
+    '''
+    cls = type(value)
+    if cls not in (tuple, frozenset) and cls.__hash__ not in (None, object.__hash__):
+        try:
+            hash(value)
+            return cls, value
+        except TypeError:
+            pass
+
+    if cls is tuple or cls is list:
+        return cls, tuple(fingerprint(item) for item in value)
+    if cls is dict:
+        return cls, tuple((fingerprint(k), fingerprint(v)) for k, v in value.items())
+
+    # numpy and pandas are only looked at if something already imported them
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(value, np.ndarray):
+        return _array(np, value)
+
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(value, pd.DataFrame | pd.Series | pd.Index):
+        hashes = pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index)).to_numpy()
+        names = tuple(value.columns) if isinstance(value, pd.DataFrame) else value.name
+        return cls.__name__, fingerprint(names), str(value.dtypes), _array(np, hashes)
+
+    try:
+        return cls, digest(dumps(value))
+    except (PicklingError, TypeError, AttributeError) as e:
+        raise TypeError(f'cannot fingerprint {cls}') from e
+
+
+def stamp(value):
+    '''the version stamp of a mutable value, if it keeps one in `__version__`'''
+    try:
+        return getattr(value, '__version__', None)
+    except Exception:
+        return None
+
+
+class Fingerprint:
+    '''what a value looked like when it was seen
+
+    Two sightings match if they are of the same object with the same version
+    stamp (an object that is mutated in place without bumping its stamp is
+    thus taken to be unchanged), or if the values hash the same. The content
+    hash is only computed when it is needed, and then kept.
+    '''
+    __slots__ = 'value', 'stamp', '_print'
+
+    def __init__(self, value):
+        self.value = value
+        self.stamp = stamp(value)
+        self._print = None
+
+    def fingerprint(self):
+        if self._print is None:
+            self._print = fingerprint(self.value)
+        return self._print
+
+    def matches(self, other):
+        if other.value is self.value:
+            return other.stamp == self.stamp
+        if type(other.value) is not type(self.value):
+            return False
+        try:
+            return other.fingerprint() == self.fingerprint()
+        except TypeError:
+            return False
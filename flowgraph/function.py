@@ -2,12 +2,15 @@ __all__ = 'Widget',
 
 
 from debug import debug
-from . import node, entry
+from . import node, entry, executor, trace
 from .constrained import ClampedInt, ClampedFloat, OptionedStr
 from .plottable import Plottable
 from .backend import QContextMenuEvent, populate_menu, with_error_message, pyqtSlot, pyqtSignal
 from inspect import signature, Parameter
-from .util import get_static_object_from_state, static_object_state, split_at, ignore_args, wraps
+from time import perf_counter
+from .util import get_static_object_from_state, static_object_state, split_at, ignore_args
+from .call import coerce, split_results
+from .memo import Memo
 from funcpipes import nothing
 
 
@@ -16,32 +19,23 @@ def default(param: Parameter):
     return param.default if param.default != Parameter.empty else None
 
 
-def cast(param: Parameter):
-    anno = param.annotation
-    return anno if anno and anno != Parameter.empty else lambda x: x
-
-
-def try_to(f):
-    @wraps(f)
-    def do_f(x):
-        try:
-            return f(x)
-        except:
-            return x
-    return do_f
-
-
 class Widget(node.Widget):
     trigger = pyqtSignal()
+    finished = pyqtSignal(int, object)
 
     def __init__(self, func=None):
         self.n_args = self.n_returns = self.n_actions = 0
         super().__init__()
         self.func = None
+        self.memo = None
+        self._future = None
+        self._generation = 0
+        self._stats = dict(calls=0, time=0.0, total=0.0, error=None)
         if func is not None:
             self.setFunction(func)
 
         self.trigger.connect(self.eval)
+        self.finished.connect(self.onFinished)
 
     def function(self):
         return self.func
@@ -50,6 +44,7 @@ class Widget(node.Widget):
         self.setTitle(func.__name__)
         self.func = func
         self.signature = signature(func)
+        self.memo = Memo(func.__memoize__) if hasattr(func, '__memoize__') else None
 
         if no_entries:
             return
@@ -62,6 +57,8 @@ class Widget(node.Widget):
             e.output().setEnabled(True)
             if isinstance(e, entry.Generic):
                 e.setLines(1)
+            if isinstance(e, entry.Coalescing) and hasattr(func, '__coalesce__'):
+                e.setCoalescing(**func.__coalesce__)
             self.addEntry(e)
             self.n_args += 1
 
@@ -92,48 +89,116 @@ class Widget(node.Widget):
         self.eval()
 
     def eval(self):
+        with trace.span(self.name(), 'request'):
+            scene = self.scene()
+            if scene is None:
+                return self.compute()
+            scene.scheduler().request(self)
+
+    def split(self):
+        entries = self.entries()
+        arg_entries, entries = split_at(self.n_args)(entries)
+        return_entries, entries = split_at(self.n_returns)(entries)
+        action_entries, entries = split_at(self.n_actions)(entries)
+        assert len(entries) == 0, entries
+        return arg_entries, return_entries, action_entries
+
+    def derives(self, entry):
+        return entry in self.entries()[self.n_args:]
+
+    def stats(self):
+        return self._stats
+
+    def record(self, start, error=None):
+        elapsed = perf_counter() - start
+        self._stats['calls'] += 1
+        self._stats['time'] = elapsed
+        self._stats['total'] += elapsed
+        self._stats['error'] = None if error is None else f'{type(error).__name__}: {error}'
+        item = self.item()
+        if item is not None:
+            item.update()
+
+    def compute(self):
         assert self.func is not None
 
-        try:
-            self.setErrrored(False)
-            entries = self.entries()
-            arg_entries, entries = split_at(self.n_args)(entries)
-            return_entries, entries = split_at(self.n_returns)(entries)
-            action_entries, entries = split_at(self.n_actions)(entries)
-            assert len(entries) == 0, entries
-            assert len(arg_entries) == len(self.signature.parameters), f'{arg_entries} != {self.signature.parameters}'
-
-            args = [
-                try_to(cast(param))(arg_entry.value())
-                for arg_entry, param in zip(arg_entries, self.signature.parameters.values())
-            ]
-            results = self.func(*args)
-            if results is nothing:
-                debug('got nothing')
-                return
-
-            for a, e in zip(args, arg_entries):
-                e.setValueSilentlyIfDifferent(a)
-
-            for e in action_entries:
-                e.setValue(results)
-
-            if self.n_returns == 1:
-                return_entries[0].setValue(results)
-                return results
-
-            if results is None:
-                results = ()
-
-            assert len(return_entries) == len(results), (return_entries, results)
-            for return_entry, result in zip(return_entries, results):
-                return_entry.setValue(result)
-
-            return results
-        except Exception as e:
-            from traceback import print_exception
-            print_exception(e)
-            self.setErrrored(True)
+        start = perf_counter()
+        with trace.span(self.name(), 'eval', effect=self):
+            try:
+                self.setErrrored(False)
+                arg_entries, return_entries, action_entries = self.split()
+                assert len(arg_entries) == len(self.signature.parameters), f'{arg_entries} != {self.signature.parameters}'
+
+                args = coerce([ e.value() for e in arg_entries ], self.signature)
+                key = None
+                if self.memo is not None:
+                    key = self.memo.key(args, self.signature)
+                    found, results = self.memo.lookup(key)
+                    self.setToolTip(str(self.memo))
+                    if found:
+                        self.apply(args, results)
+                        return self.record(start)
+
+                kind = getattr(self.func, '__executor__', None)
+                if kind is not None:
+                    return self.submit(kind, args, key, start)
+
+                results = self.func(*args)
+                if self.memo is not None:
+                    self.memo.store(key, results)
+                self.apply(args, results)
+                self.record(start)
+            except Exception as e:
+                self.fail(e)
+                self.record(start, e)
+
+    def submit(self, kind, args, key, start):
+        '''run the function in a worker; results of older submissions are dropped'''
+        if self._future is not None:
+            self._future.cancel()
+        self._generation += 1
+        generation = self._generation
+        self._future = executor.submit(kind, self.func, *args)
+        self._future.add_done_callback(lambda future: self.finished.emit(generation, (args, key, start, future)))
+
+    def onFinished(self, generation, job):
+        args, key, start, future = job
+        if generation != self._generation or future.cancelled():
+            return
+        self._future = None
+
+        with trace.span(self.name(), 'finished'):
+            try:
+                results = future.result()
+                if self.memo is not None:
+                    self.memo.store(key, results)
+                self.apply(args, results)
+                self.record(start)
+            except Exception as e:
+                self.fail(e)
+                self.record(start, e)
+
+    def apply(self, args, results):
+        if results is nothing:
+            debug('got nothing')
+            return
+
+        arg_entries, return_entries, action_entries = self.split()
+        for a, e in zip(args, arg_entries):
+            e.setValueSilentlyIfDifferent(a)
+
+        for e in action_entries:
+            e.setValue(results)
+
+        for return_entry, result in zip(return_entries, split_results(results, self.n_returns)):
+            return_entry.setValueIfDifferent(result)  # unchanged results stop here
+
+        return results
+
+    def fail(self, e):
+        from traceback import print_exception
+        print_exception(e)
+        self.setErrrored(True)
 
     def createEntry(self, param: Parameter, output=False):
         spec = param.annotation
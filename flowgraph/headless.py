@@ -0,0 +1,348 @@
+__all__ = 'Entry', 'Node', 'Graph', 'load'
+
+from debug import debug
+from inspect import signature
+from funcpipes import nothing
+from .util import get_static_object_from_state, split_at
+from .call import coerce, split_results
+from .dag import Scheduler
+from .memo import Memo
+from .fingerprint import Fingerprint
+from . import trace, store
+
+
+class Entry:
+    '''an entry of a headless node: a value plus the edges leaving it
+
+    Number entries (those with a start and stop) are clamped and rounded the
+    way the spin boxes would do it, and only notify when their value changes;
+    all other entries notify on every `setValue`. Nodes only set results that
+    differ from the previous ones (`setValueIfDifferent`).
+    '''
+
+    def __init__(self, node, state):
+        self._node = node
+        self._state = state
+        self._sinks = []
+        self.source = None
+        self._value = None
+        self._handle = store.handle(state['value']) if 'value' in state else None
+
+    def node(self):
+        return self._node
+
+    def id(self):
+        return self._state.get('id')
+
+    def name(self):
+        return self._state.get('name')
+
+    def numeric(self):
+        return 'start' in self._state and 'stop' in self._state
+
+    def value(self):
+        if self._handle is not None:
+            self._value = self._handle.resolve()
+            self._handle = None
+        return self._value
+
+    def coerce(self, value):
+        if not self.numeric() or value is None:
+            return value
+        value = min(max(value, self._state['start']), self._state['stop'])
+        if 'decimals' in self._state:
+            return round(float(value), self._state['decimals'])
+        return int(value)
+
+    def setValueSilently(self, value):
+        self._handle = None
+        self._value = self.coerce(value)
+
+    def setValue(self, value):
+        value = self.coerce(value)
+        if self.numeric() and value == self.value():
+            return
+        with trace.span(self.name() or '', 'setValue'):
+            self._handle = None
+            self._value = value
+            for sink in self._sinks:
+                sink.setValue(value)
+            self._node.changed(self)
+
+    def setValueIfDifferent(self, value):
+        if not Fingerprint(self.value()).matches(Fingerprint(self.coerce(value))):
+            self.setValue(value)
+
+    def setSource(self, source):
+        self.unsetSource()
+        if self._handle is None or source._handle is None:  # two loaded values already agree
+            self.setValue(source.value())
+        self.source = source
+        source._sinks.append(self)
+
+    def unsetSource(self):
+        if self.source is not None:
+            self.source._sinks.remove(self)
+            self.source = None
+
+    def state(self):
+        state = dict(self._state)
+        state.pop('value', None)
+        if self._handle is not None:
+            state['value'] = self._handle.encode()
+        elif self.value() is not None:
+            state['value'] = store.encode(self.value())
+        return state
+
+
+class Node:
+    '''a node loaded from `node.Item` (or bare `node.Widget`) state
+
+    Function nodes evaluate exactly like `function.Widget.eval`: the argument
+    entries are cast to the annotated types, the results go to the return
+    entries and the action entries receive the raw results.
+    '''
+
+    def __init__(self, state, graph=None):
+        self._graph = graph
+        self._state = state
+        widget = self.widgetState()
+        self.func = None
+        self.signature = None
+        self.memo = None
+        self.n_args = widget.get('n_args', 0)
+        self.n_returns = widget.get('n_returns', 0)
+        self.n_actions = widget.get('n_actions', 0)
+        if 'function' in widget:
+            self.func = get_static_object_from_state(widget['function'])
+            self.signature = signature(self.func)
+            if hasattr(self.func, '__memoize__'):
+                self.memo = Memo(self.func.__memoize__)
+        self._entries = [ Entry(self, entry_state) for entry_state in widget.get('entries', ()) ]
+        self.error = None
+
+    def widgetState(self):
+        return self._state.get('widget', self._state)
+
+    def id(self):
+        return self.widgetState().get('id')
+
+    def name(self):
+        return self.widgetState().get('name')
+
+    def entries(self):
+        return self._entries.copy()
+
+    def entry(self, key):
+        if isinstance(key, int):
+            return self._entries[key]
+        for entry in self._entries:
+            if entry.name() == key:
+                return entry
+        raise KeyError(key)
+
+    def arguments(self):
+        return self._entries[:self.n_args] if self.func is not None else []
+
+    def upstream(self):
+        return [ e.source.node() for e in self._entries if e.source is not None ]
+
+    def errored(self):
+        return self.error is not None
+
+    def changed(self, entry):
+        if self._graph is not None and entry in self.arguments():
+            self._graph.request(self)
+
+    def compute(self):
+        if self.func is None:
+            return
+        with trace.span(self.name() or '', 'eval', effect=self):
+            return self.run()
+
+    def run(self):
+        assert self.signature is not None
+
+        try:
+            self.error = None
+            entries = self._entries
+            arg_entries, entries = split_at(self.n_args)(entries)
+            return_entries, entries = split_at(self.n_returns)(entries)
+            action_entries, entries = split_at(self.n_actions)(entries)
+            assert len(entries) == 0, entries
+            assert len(arg_entries) == len(self.signature.parameters), f'{arg_entries} != {self.signature.parameters}'
+
+            args = coerce([ e.value() for e in arg_entries ], self.signature)
+            if self.memo is None:
+                results = self.func(*args)
+            else:
+                results = self.memo.call(self.func, args, self.signature)
+            if results is nothing:
+                debug('got nothing')
+                return
+
+            for a, e in zip(args, arg_entries):
+                e.setValueSilently(a)
+
+            for e in action_entries:
+                e.setValueSilently(results)
+
+            for return_entry, result in zip(return_entries, split_results(results, self.n_returns)):
+                return_entry.setValueIfDifferent(result)
+
+            return results
+        except Exception as e:
+            from traceback import print_exception
+            print_exception(e)
+            self.error = e
+
+    def state(self):
+        widget = dict(self.widgetState(), entries=[ e.state() for e in self._entries ])
+        if 'widget' not in self._state:
+            return widget
+        return dict(self._state, widget=widget)
+
+
+class Graph:
+    '''a Qt-free version of `editor.Scene`
+
+    Accepts the state of a `window.Window`, an `editor.View` or an
+    `editor.Scene`. Nodes and entries can be looked up by ID, and entries also
+    by (node, entry) pairs of indices or names. Nothing is evaluated on load; call `evaluate()` to run every
+    function node once, in topological order. After that, `setValue()`
+    propagates a change to everything downstream of it.
+    '''
+
+    def __init__(self):
+        self._nodes = []
+        self._node_ids = {}
+        self._entry_ids = {}
+        self._scheduler = Scheduler(self.nodes, Node.upstream)
+        self._root = {}
+        self._path = ()
+
+    @classmethod
+    def fromState(cls, state):
+        graph = cls()
+        graph.setState(state)
+        return graph
+
+    def setState(self, state):
+        self._root, self._path = state, ()
+        for key in 'editor', 'scene':
+            if key in state:
+                self._path += key,
+                state = state[key]
+        self._nodes = []
+        self._node_ids = {}
+        self._entry_ids = {}
+        self.addState(state)
+        return self
+
+    def addState(self, state):
+        for node_state in state.get('nodes', ()):
+            self.addNode(Node(node_state, self))
+        with self._scheduler.deferred():
+            for edge in state.get('edges', ()):
+                self.addEdge(edge['source'], edge['sink'])
+            self._scheduler.clear()
+
+    def nodes(self):
+        return self._nodes.copy()
+
+    def node(self, key):
+        if isinstance(key, int):
+            return self._nodes[key]
+        if key in self._node_ids:
+            return self._node_ids[key]
+        for node in self._nodes:
+            if node.name() == key:
+                return node
+        raise KeyError(key)
+
+    def addNode(self, node):
+        node._graph = self
+        self._nodes.append(node)
+        if node.id() is not None:
+            self._node_ids[node.id()] = node
+        for entry in node.entries():
+            if entry.id() is not None:
+                self._entry_ids[entry.id()] = entry
+        return node
+
+    def entry(self, key):
+        if isinstance(key, Entry):
+            return key
+        if isinstance(key, str):
+            return self._entry_ids[key]
+        n, e = key
+        return self.node(n).entry(e)
+
+    def edges(self, with_indices=False, with_ids=False):
+        '''(source, sink) pairs of entries, or of their IDs or (node, entry) indices'''
+        indices = { node: n for n, node in enumerate(self._nodes) } if with_indices else {}
+        for n, node in enumerate(self._nodes):
+            for e, entry in enumerate(node.entries()):
+                source = entry.source
+                if source is None:
+                    continue
+                if with_ids:
+                    yield source.id(), entry.id()
+                elif with_indices:
+                    yield (indices[source.node()], source.node().entries().index(source)), (n, e)
+                else:
+                    yield source, entry
+
+    def addEdge(self, source, sink):
+        self.entry(sink).setSource(self.entry(source))
+
+    def value(self, key):
+        return self.entry(key).value()
+
+    def setValue(self, key, value):
+        self.entry(key).setValue(value)
+
+    def scheduler(self):
+        return self._scheduler
+
+    def request(self, node):
+        self._scheduler.request(node)
+
+    def evaluate(self):
+        '''run every function node once, upstream nodes first'''
+        with self._scheduler.deferred():
+            for node in self._nodes:
+                if node.func is not None:
+                    self._scheduler.request(node)
+
+    def edgeKeys(self):
+        '''save edges by ID, unless some entry has none (loaded from an older file)'''
+        if all(entry.id() is not None for node in self._nodes for entry in node.entries()):
+            return dict(with_ids=True)
+        return dict(with_indices=True)
+
+    def sceneState(self):
+        scene = self._root
+        for key in self._path:
+            scene = scene[key]
+        return dict(
+            scene,
+            nodes=[ node.state() for node in self._nodes ],
+            edges=[ dict(source=source, sink=sink) for source, sink in self.edges(**self.edgeKeys()) ],
+        )
+
+    def state(self):
+        '''the state that was loaded, with the current values'''
+        def rebuild(state, path):
+            if not path:
+                return self.sceneState()
+            key, *path = path
+            return dict(state, **{ key: rebuild(state[key], path) })
+        return rebuild(self._root, self._path)
+
+
+def load(path):
+    '''load a saved graph (e.g., nodes.json or a .flowgraph bundle) into a `Graph`'''
+    state, values = store.read(path)
+    with store.using(values):
+        return Graph.fromState(state)
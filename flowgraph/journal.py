@@ -0,0 +1,248 @@
+__all__ = 'Journal', 'replay'
+
+from json import dumps, loads, JSONDecodeError
+from os import fsync, replace
+from pathlib import Path
+from shutil import copytree, rmtree
+from .backend import QObject, QTimer, pyqtSignal
+from . import store, executor
+
+
+def replay(state, records):
+    '''apply journal records to a saved `window.Window` state, in place
+
+    Nodes and entries are found by their IDs; records about things that are
+    gone are skipped.
+    '''
+    scene = state['editor']['scene']
+    nodes = { item['widget']['id']: item for item in scene['nodes'] }
+    entries = { e['id']: e for item in scene['nodes'] for e in item['widget']['entries'] }
+    edges = { edge['sink']: edge['source'] for edge in scene['edges'] }
+
+    for record in records:
+        op = record['op']
+        if op == 'node':
+            item = record['state']
+            nodes[item['widget']['id']] = item
+            entries.update((e['id'], e) for e in item['widget']['entries'])
+        elif op == 'remove' and record['id'] in nodes:
+            gone = { e['id'] for e in nodes.pop(record['id'])['widget']['entries'] }
+            edges = { sink: source for sink, source in edges.items() if sink not in gone and source not in gone }
+            for id in gone:
+                entries.pop(id, None)
+        elif op == 'move' and record['id'] in nodes:
+            nodes[record['id']]['position'] = dict(x=record['x'], y=record['y'])
+        elif op == 'edge':
+            edges[record['sink']] = record['source']
+        elif op == 'unedge':
+            edges.pop(record['sink'], None)
+        elif op == 'value' and record['entry'] in entries:
+            entry = entries[record['entry']]
+            if record['value'] is None:
+                entry.pop('value', None)
+            elif 'value' in entry:
+                entry['value'] = record['value']
+            else:  # the value goes before the callbacks, or loading it would call them
+                callbacks = entry.pop('callbacks', None)
+                entry['value'] = record['value']
+                if callbacks is not None:
+                    entry['callbacks'] = callbacks
+
+    scene['nodes'] = list(nodes.values())
+    scene['edges'] = [ dict(source=source, sink=sink) for sink, source in edges.items() ]
+    return state
+
+
+def read_records(path):
+    '''the records in a journal; a line cut short by a crash is skipped'''
+    records = []
+    try:
+        with open(path) as file:
+            for line in file:
+                try:
+                    records.append(loads(line))
+                except JSONDecodeError:
+                    pass
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def compact(snapshot, records):
+    '''fold the records into the snapshot; runs in a worker thread'''
+    state, values = store.read(snapshot)
+    state.pop('seq', None)
+    state = replay(state, records)
+    state['seq'] = records[-1]['seq']
+    if values.blobs:
+        state['blobs'] = values.blobs
+    if not isinstance(values, store.Bundle):
+        store.write(snapshot, lambda: state)
+        return state['seq']
+    manifest = values.root / values.manifest  # the value files stay as they are
+    temp = manifest.with_name(f'.{manifest.name}.tmp')
+    with open(temp, 'w') as file:
+        file.write(dumps(state, separators=(',', ':')))
+    replace(temp, manifest)
+    return state['seq']
+
+
+def delete(path):
+    if path.is_dir():
+        rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def clone(source, target):
+    '''a copy of a saved file or bundle, made of hard links where possible
+
+    Saving replaces files rather than writing into them, so the copy keeps
+    the old contents.
+    '''
+    delete(target)
+    if source.is_dir():
+        copytree(source, target, copy_function=store.link_or_copy)
+    else:
+        store.link_or_copy(source, target)
+
+
+class Journal(QObject):
+    '''autosave for a `window.Window` as an append-only log of changes
+
+    Next to the state file `name`, `.name.autosave.json` (or, for a bundle,
+    `.name.autosave.flowgraph`) is a snapshot and `.name.journal` holds the
+    changes since then, one JSON record per line
+    (node added, removed or moved, edge connected or not, input value set).
+    Changes are flushed once a second, so a crash loses at most that much;
+    once enough of them have piled up, they are folded into the snapshot in
+    the background. If the files are still there when the window is opened
+    again (i.e., it was not closed properly), `recover` restores the state.
+    '''
+    compacted = pyqtSignal(object)
+    interval = 1000
+    compact_after = 1000
+
+    def __init__(self, window, path):
+        super().__init__(window)
+        self._window = window
+        path = Path(path)
+        suffix = '.flowgraph' if path.suffix == '.flowgraph' else '.json'
+        self.snapshot = path.with_name(f'.{path.name}.autosave{suffix}')
+        self.path = path.with_name(f'.{path.name}.journal')
+        self._pending = {}
+        self._unsaved = []  # flushed, but not in the snapshot yet
+        self._seq = 0
+        self._file = None
+        self._compacting = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.interval)
+        self._timer.timeout.connect(self.flush)
+        self.compacted.connect(self.onCompacted)
+
+    def scene(self):
+        return self._window.editor().scene()
+
+    def recover(self):
+        '''load the autosaved state, if any; returns whether there was one'''
+        if not self.snapshot.exists():
+            return False
+        state, values = store.read(self.snapshot)
+        seq = state.pop('seq', 0)
+        records = [ r for r in read_records(self.path) if r['seq'] > seq ]
+        replay(state, records)
+        with store.using(values):
+            self._window.setState(state)
+        self.reevaluate(records)
+        return True
+
+    def reevaluate(self, records):
+        '''recompute what follows from the recovered input values (only those are journaled)'''
+        scene = self.scene()
+        with scene.transaction():
+            for record in records:
+                if record['op'] != 'value':
+                    continue
+                try:
+                    widget = scene.entry(record['entry']).parent()
+                except KeyError:
+                    continue
+                if hasattr(widget, 'compute'):
+                    scene.scheduler().request(widget)
+
+    def start(self, saved=None):
+        '''snapshot the current state and start journaling from there
+
+        saved: the file the state was just loaded from or saved to, if any;
+               the snapshot is then a `clone` of it, rather than written anew
+        '''
+        self.stop()
+        if saved is not None:
+            clone(Path(saved), self.snapshot)
+        else:
+            store.write(self.snapshot, self._window)
+        self._seq = 0
+        self._file = open(self.path, 'w')
+        self.scene().setJournal(self)
+        self._timer.start()
+
+    def stop(self, remove=False):
+        self.scene().setJournal(None)
+        self._timer.stop()
+        if self._compacting is not None:  # it writes the snapshot too
+            self._compacting.exception()
+            self._compacting = None
+        self._pending.clear()
+        self._unsaved.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove:
+            self.path.unlink(missing_ok=True)
+            delete(self.snapshot)
+
+    def record(self, op, key=None, **fields):
+        '''queue a change; a later one with the same key replaces it'''
+        key = (op, key) if key is not None else object()
+        self._pending.pop(key, None)
+        self._pending[key] = dict(op=op, **fields)
+
+    def encode(self, record):
+        if 'item' in record:
+            record['state'] = record.pop('item').state()
+        if 'entry' in record:
+            entry = record.pop('entry')
+            record['entry'] = entry.id()
+            value = entry.value()
+            record['value'] = store.encode(value) if value is not None else None
+        return record
+
+    def flush(self):
+        if not self._pending or self._file is None:
+            return
+        pending, self._pending = self._pending, {}
+        for record in pending.values():
+            self._seq += 1
+            record = dict(self.encode(record), seq=self._seq)
+            self._file.write(dumps(record, separators=(',', ':')) + '\n')
+            self._unsaved.append(record)
+        self._file.flush()
+        fsync(self._file.fileno())
+        if len(self._unsaved) >= self.compact_after and self._compacting is None:
+            self._compacting = executor.thread_pool().submit(compact, self.snapshot, list(self._unsaved))
+            self._compacting.add_done_callback(self.compacted.emit)
+
+    def onCompacted(self, future):
+        if future is not self._compacting:  # stopped since
+            return
+        self._compacting = None
+        if future.exception() is not None:
+            return
+        seq = future.result()
+        self._unsaved = [ r for r in self._unsaved if r['seq'] > seq ]
+        self._file.close()
+        temp = self.path.with_name(f'{self.path.name}.tmp')
+        with open(temp, 'w') as file:
+            file.writelines(dumps(r, separators=(',', ':')) + '\n' for r in self._unsaved)
+        replace(temp, self.path)
+        self._file = open(self.path, 'a')
@@ -0,0 +1,62 @@
+__all__ = 'Memo',
+
+from collections import OrderedDict
+from .fingerprint import fingerprint
+
+
+class Memo:
+    '''a bounded, least-recently-used cache of a function's results
+
+    Keys are the fingerprints (see `fingerprint.fingerprint`) of the coerced
+    arguments, i.e., of exactly what the function is called with, so a hit
+    always returns the results for equal arguments. Calls whose arguments
+    cannot be fingerprinted are simply not cached.
+    '''
+
+    def __init__(self, maxsize=128):
+        self._cache = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+
+    def key(self, args, signature):
+        '''the key for `args`, or None if they cannot be fingerprinted'''
+        try:
+            return tuple(fingerprint(arg) for arg in args)
+        except TypeError:
+            return None
+
+    def lookup(self, key):
+        '''return (found, results)'''
+        if key is None:
+            return False, None
+        if key not in self._cache:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return True, self._cache[key]
+
+    def store(self, key, results):
+        if key is None:
+            return
+        self._cache[key] = results
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def call(self, func, args, signature):
+        key = self.key(args, signature)
+        found, results = self.lookup(key)
+        if not found:
+            results = func(*args)
+            self.store(key, results)
+        return results
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __str__(self):
+        return f'cache: {self.hits} hits, {self.misses} misses, {len(self)}/{self.maxsize} entries'
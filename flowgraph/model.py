@@ -0,0 +1,162 @@
+__all__ = 'Port', 'Node', 'Graph'
+
+from .dag import topological_order, ancestors
+from .util import new_id
+
+
+class Port:
+    '''an entry of a node, as far as the graph goes: where its edge comes from and where it goes
+
+    view: what it stands for (e.g., an `entry.Entry`), or None
+    '''
+    __slots__ = 'id', 'node', 'view', 'source', 'sinks'
+
+    def __init__(self, id, node, view=None):
+        self.id, self.node, self.view = id, node, view
+        self.source = None
+        self.sinks = []
+
+    def setSource(self, source):
+        '''connect to `source` (another `Port`), or disconnect with None'''
+        if self.source is not None:
+            self.source.sinks.remove(self)
+        self.source = source
+        if source is not None:
+            source.sinks.append(self)
+
+    def __repr__(self):
+        return f'<Port {self.id}>'
+
+
+class Node:
+    '''a node: its ports, in order
+
+    view: what it stands for (e.g., a `node.Widget`), or None
+    '''
+    __slots__ = 'id', 'view', 'ports'
+
+    def __init__(self, id, view=None):
+        self.id, self.view = id, view
+        self.ports = []
+
+    def upstream(self):
+        return [ port.source.node for port in self.ports if port.source is not None ]
+
+    def downstream(self):
+        return [ sink.node for port in self.ports for sink in port.sinks ]
+
+    def __repr__(self):
+        return f'<Node {self.id}>'
+
+
+class Graph:
+    '''the structure of a graph (nodes, their ports and the edges between them), without Qt
+
+    `editor.Scene` keeps one in step with its items, which are views over it:
+    ordering, traversal and saving the edges go through the model rather than
+    the widgets and sockets. `fromState` builds one straight from a saved
+    scene, without creating any widgets. Nodes and ports are looked up by ID.
+    '''
+
+    def __init__(self):
+        self._nodes = {}
+        self._ports = {}
+
+    @classmethod
+    def fromState(cls, state):
+        '''the structure of a saved `window.Window`, `editor.View` or `editor.Scene`
+
+        Like `editor.Scene.addState`, this takes edges between entry IDs or
+        (node, entry) index pairs; nodes and entries saved without IDs (by
+        older versions) are given new ones.
+        '''
+        for key in 'editor', 'scene':
+            state = state.get(key, state)
+        graph = cls()
+        nodes = []
+        for item in state.get('nodes', ()):
+            widget = item.get('widget', item)
+            node = graph.addNode(widget.get('id') or new_id())
+            for entry in widget.get('entries', ()):
+                graph.addPort(node, entry.get('id') or new_id())
+            nodes.append(node)
+
+        def port(key):
+            if isinstance(key, list | tuple):
+                n, e = key
+                return nodes[n].ports[e]
+            return key
+
+        for edge in state.get('edges', ()):
+            graph.connect(port(edge['source']), port(edge['sink']))
+        return graph
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def nodes(self):
+        return list(self._nodes.values())
+
+    def node(self, id):
+        return self._nodes[id]
+
+    def port(self, id):
+        '''the port with that ID (or None)'''
+        return self._ports.get(id)
+
+    def addNode(self, id, view=None):
+        if id in self._nodes:
+            raise KeyError(f'{id!r} is taken')
+        node = self._nodes[id] = Node(id, view)
+        return node
+
+    def removeNode(self, node):
+        '''remove the node and its ports, with the edges to and from them'''
+        node = self._nodes.pop(node.id if isinstance(node, Node) else node)
+        for port in list(node.ports):
+            self.removePort(port)
+        return node
+
+    def addPort(self, node, id, view=None):
+        if id in self._ports:
+            raise KeyError(f'{id!r} is taken')
+        node = node if isinstance(node, Node) else self._nodes[node]
+        port = self._ports[id] = Port(id, node, view)
+        node.ports.append(port)
+        return port
+
+    def removePort(self, port):
+        port = self._ports.pop(port.id if isinstance(port, Port) else port)
+        port.setSource(None)
+        for sink in list(port.sinks):
+            sink.setSource(None)
+        port.node.ports.remove(port)
+        return port
+
+    def connect(self, source, sink):
+        '''connect two ports, given as ports or IDs'''
+        sink = sink if isinstance(sink, Port) else self._ports[sink]
+        sink.setSource(source if isinstance(source, Port) else self._ports[source])
+
+    def disconnect(self, sink):
+        sink = sink if isinstance(sink, Port) else self._ports[sink]
+        sink.setSource(None)
+
+    def edges(self):
+        '''(source, sink) pairs of port IDs, in the order of the sinks'''
+        for node in self._nodes.values():
+            for port in node.ports:
+                if port.source is not None:
+                    yield port.source.id, port.id
+
+    def order(self, nodes=None):
+        '''`nodes` (default: all of them), each after everything upstream of it'''
+        return topological_order(self._nodes.values() if nodes is None else nodes, Node.upstream)
+
+    def ancestors(self, nodes):
+        '''the nodes and everything upstream of them'''
+        return ancestors(nodes, Node.upstream)
+
+    def descendants(self, nodes):
+        '''the nodes and everything downstream of them'''
+        return ancestors(nodes, Node.downstream)
@@ -5,12 +5,39 @@ from debug import debug
 from .backend import (
     Qt, QPainter, QRectF, get_pen, get_brush, QMenu, QGraphicsItem, QGraphicsWidget, QPainterPath, QGraphicsProxyWidget, QGroupBox,
     QVBoxLayout, QPointF, QContextMenuEvent, QKeySequence, populate_menu, with_error_message, QMouseEvent,
-    QApplication, widgets_at
+    QApplication, widgets_at, QPen, QBrush, QColor, QFont, QFontMetrics
 )
 from typing import Any
-from .entry import Entry
-from .util import get_static_object_from_state, ignore_args
+from functools import cache
+from math import log10
+from .util import get_static_object_from_state, ignore_args, new_id
 from .stateful import Stateful
+from . import trace
+
+
+@cache
+def badge_font():
+    font = QFont()
+    font.setPointSize(7)
+    return font
+
+
+@cache
+def title_font():
+    font = QFont()
+    font.setBold(True)
+    return font
+
+
+@cache
+def badge_height():
+    return QFontMetrics(badge_font()).height() + 2
+
+
+def heat(seconds):
+    '''green for 1 ms or less, through yellow, to red for 1 s or more'''
+    x = min(max((log10(max(seconds, 1e-9)) + 3) / 3, 0), 1)
+    return QColor.fromHsvF((1 - x) / 3, 0.8, 0.9)
 
 
 class Widget(QGroupBox, Stateful):
@@ -21,7 +48,8 @@ class Widget(QGroupBox, Stateful):
         self.setLayout(QVBoxLayout())
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.DefaultContextMenu)
         self._item = None
-        self._state = {}
+        self._entries = []
+        self._state = dict(id=new_id())
 
         self._errored = False
 
@@ -31,6 +59,10 @@ class Widget(QGroupBox, Stateful):
     def setErrrored(self, value=True):
         self._errored = value
 
+    def stats(self):
+        '''timing of the evaluations (see `function.Widget`), if the node evaluates'''
+        return None
+
     def layout(self):
         layout = super().layout()
         assert layout is not None
@@ -42,20 +74,53 @@ class Widget(QGroupBox, Stateful):
     def setName(self, name):
         return self.setTitle(name)
 
+    def id(self):
+        return self._state['id']
+
+    def setId(self, id):
+        self._state['id'] = id
+
     def addEntry(self, widget):
         widget.setParent(self)
+        self._entries.append(widget)
+        scene = self.scene()
+        if scene is not None:
+            scene.registerEntry(widget)
         return self.layout().addWidget(widget)
 
     def removeEntry(self, widget):
+        scene = self.scene()
+        if scene is not None:
+            scene.unregisterEntry(widget)
+        self._entries.remove(widget)
         widget.remove()
         del widget
 
     def removeAllEntries(self):
-        for entry in self.entries():
+        for entry in list(self._entries):
             self.removeEntry(entry)
 
     def entries(self):
-        return [ c for c in self.children() if isinstance(c, Entry) ]
+        '''the entries, in order (the list itself: do not modify it)'''
+        return self._entries
+
+    def derives(self, entry):
+        '''whether the node computes the entry's value'''
+        return False
+
+    def resolve(self):
+        '''decode the entries' loaded values, see `Entry.resolve`'''
+        for entry in self._entries:
+            entry.resolve()
+
+    def attach(self):
+        '''create the entries' views, see `entry.Virtual`'''
+        for entry in self._entries:
+            entry.attach()
+
+    def detach(self):
+        for entry in self._entries:
+            entry.detach()
 
     def inputs(self):
         for entry in self.entries():
@@ -88,7 +153,7 @@ class Widget(QGroupBox, Stateful):
     def iterState(self):
         yield from super().iterState()
         yield 'name', self.name()
-        yield 'entries', [ entry.state() for entry in self.entries() ]
+        yield 'entries', iter(self.entries())
 
     def setState(self, state, missing='error'):
         state = Stateful.setState(self, state, missing='return')
@@ -114,6 +179,15 @@ class Widget(QGroupBox, Stateful):
             return None
         return item.editor()
 
+    def scene(self):
+        item = self.item()
+        if item is None:
+            return None
+        return QGraphicsItem.scene(item)
+
+    def upstream(self):
+        return [ entry.source.parent() for entry in self.entries() if entry.source is not None ]
+
 
 class Item(QGraphicsItem, Stateful):
     def __init__(self, widget: Widget | None = None):
@@ -139,12 +213,24 @@ class Item(QGraphicsItem, Stateful):
 
     def setWidget(self, widget):
         self.proxy = Proxy(self, widget)
+        self.proxy.geometryChanged.connect(self.prepareGeometryChange)  # the border follows the widget
         widget.setItem(self)
 
-    def boundingRect(self) -> QRectF:
+    def box(self) -> QRectF:
         w = self._state['border']['padding']
         return QRectF(-w, -w, self.width() + 2 * w, self.height() + 2 * w).normalized()
 
+    def boundingRect(self) -> QRectF:
+        w = max(3 * self._state['border']['width'], 2) / 2  # half the widest pen, see paintBorder
+        rect = self.box().adjusted(-w, -w, w, w)
+        if self.timingOverlay():
+            rect.setTop(rect.top() - badge_height())
+        return rect
+
+    def timingOverlay(self):
+        scene = QGraphicsItem.scene(self)
+        return scene is not None and scene.timingOverlay()  # type: ignore
+
     def width(self):
         return self.proxy.widget().width()
 
@@ -152,17 +238,76 @@ class Item(QGraphicsItem, Stateful):
         return self.proxy.widget().height()
 
     def paint(self, painter: QPainter, option, widget):
+        with trace.span(self.widget().name(), 'paint'):
+            self.paintBorder(painter)
+            if self.scene().simplifies(option, painter):
+                self.paintTitle(painter, option)
+
+    def paintTitle(self, painter: QPainter, option):
+        '''the name in place of the widget (which is not drawn), when zoomed out'''
+        rect = self.box()
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        name = self.widget().name()
+        font = QFont(title_font())
+        fit = rect.width() / max(QFontMetrics(font).horizontalAdvance(name), 1)  # as large as it fits, up to what
+        font.setPointSizeF(font.pointSizeF() * min(fit, 1 / max(lod, 1e-3)))     # would be the usual size on screen
+        painter.setFont(font)
+        painter.setPen(get_pen('white'))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, name)
+
+    def paintBorder(self, painter: QPainter):
         mult = 3 if self.isSelected() else 1
 
         path = QPainterPath()
         path.setFillRule(Qt.FillRule.WindingFill)
         r = self._state['border']['radius']
-        rect = self.boundingRect()
+        rect = self.box()
         path.addRoundedRect(rect, r, r)
-        painter.setPen(get_pen(self._state['border']['error' if self.widget().errored() else 'color'], mult * self._state['border']['width']))
+        pen = get_pen(self._state['border']['error' if self.widget().errored() else 'color'], mult * self._state['border']['width'])
+        stats = self.widget().stats() if self.timingOverlay() else None
+        if stats is not None and stats['calls'] and not self.widget().errored():
+            pen = QPen(heat(stats['time']), max(2, pen.width()))
+        if self.scene().scheduler().isPending(self.widget()):  # stale, see editor.Scene.setEvaluation
+            pen = QPen(pen)
+            pen.setStyle(Qt.PenStyle.DashLine)
+        painter.setPen(pen)
         painter.setBrush(get_brush(self._state['background']['color']))
         painter.drawPath(path)
 
+        if stats is not None:
+            self.paintBadge(painter, rect, stats)
+
+    def paintBadge(self, painter: QPainter, rect: QRectF, stats):
+        if not stats['calls']:
+            text = 'not run'
+        else:
+            text = f"{1e3 * stats['time']:.1f} ms ×{stats['calls']}"
+        if stats['error'] is not None:
+            text += ' (error)'
+        painter.setFont(badge_font())
+        h = badge_height()
+        w = QFontMetrics(badge_font()).horizontalAdvance(text) + h
+        badge = QRectF(rect.right() - w, rect.top() - h, w, h)
+        painter.setPen(Qt.PenStyle.NoPen)
+        if stats['error'] is not None:
+            color = QColor(self._state['border']['error'])
+        else:
+            color = heat(stats['time']) if stats['calls'] else QColor('gray')
+        painter.setBrush(QBrush(color))
+        painter.drawRoundedRect(badge, h / 2, h / 2)
+        painter.setPen(get_pen('black'))
+        painter.drawText(badge, Qt.AlignmentFlag.AlignCenter, text)
+
+    def itemChange(self, change, value):
+        if change == self.GraphicsItemChange.ItemScenePositionHasChanged:
+            for entry in self.widget().entries():
+                for edge in entry.input().edges() + entry.output().edges():
+                    edge.updatePath()
+            scene = QGraphicsItem.scene(self)
+            if scene is not None:
+                scene.record('move', self.widget().id(), id=self.widget().id(), x=self.x(), y=self.y())
+        return super().itemChange(change, value)
+
     #def itemChange(self, change, value):
     #    if change == self.GraphicsItemChange.ItemSelectedHasChanged:
     #        self._state['border']['width'] = 3 if self.isSelected() else 1
@@ -170,7 +315,7 @@ class Item(QGraphicsItem, Stateful):
 
     def iterState(self):
         yield from Stateful.iterState(self)
-        yield 'widget', self.widget().state()
+        yield 'widget', self.widget()
         yield 'position', dict(x=self.x(), y=self.y())
 
     def setState(self, state):
@@ -222,6 +367,15 @@ class Proxy(QGraphicsProxyWidget):
         super().__init__(parent=parent)
         self.setWidget(widget)
 
+    def paint(self, painter, option, widget):
+        scene = self.scene()
+        if scene is not None and scene.simplifies(option, painter):  # see Item.paintTitle
+            return
+        with trace.span(self.widget().name(), 'repaint'):
+            self.widget().resolve()
+            self.widget().attach()
+            super().paint(painter, option, widget)
+
     def widget(self):
         widget = super().widget()
         assert widget is not None
@@ -0,0 +1,119 @@
+__all__ = 'share', 'unshare', 'release'
+
+from multiprocessing.shared_memory import SharedMemory
+import sys
+
+
+class SharedArray:
+    '''where to find a numpy array in shared memory'''
+    __slots__ = 'name', 'dtype', 'shape'
+
+    def __init__(self, name, dtype, shape):
+        self.name, self.dtype, self.shape = name, dtype, shape
+
+
+class SharedFrame:
+    '''a pandas DataFrame or Series whose columns (and plain index) are `SharedArray`s'''
+    __slots__ = 'kind', 'columns', 'index', 'name', 'data'
+
+    def __init__(self, kind, columns, index, name, data):
+        self.kind, self.columns, self.index, self.name, self.data = kind, columns, index, name, data
+
+
+def share(value, blocks):
+    '''replace the numpy arrays in `value` with handles to shared memory
+
+    Arrays are found in tuples, lists, dicts and pandas DataFrames and Series
+    (column by column); anything else (including object arrays) is left to
+    pickle. Frames with columns of extension dtypes (categories, nullable or
+    tz-aware ones) are pickled whole, and an index other than a plain `Index`
+    (a RangeIndex, a DatetimeIndex with its freq, ...) is pickled as it is,
+    so that the value comes back unchanged. The blocks that are created are
+    appended to `blocks`.
+    '''
+    np = sys.modules.get('numpy')
+    pd = sys.modules.get('pandas')
+
+    if np is not None and isinstance(value, np.ndarray):
+        if value.dtype.hasobject or value.nbytes == 0:
+            return value
+        block = SharedMemory(create=True, size=value.nbytes)
+        blocks.append(block)
+        np.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+        return SharedArray(block.name, value.dtype.str, value.shape)
+
+    if pd is not None and isinstance(value, pd.DataFrame | pd.Series):
+        dtypes = [ value.dtype ] if isinstance(value, pd.Series) else list(value.dtypes)
+        if not all(plain(dtype) for dtype in dtypes):
+            return value
+        index = share(value.index.to_numpy(), blocks) if type(value.index) is pd.Index and plain(value.index.dtype) else value.index
+        if isinstance(value, pd.Series):
+            return SharedFrame('series', None, index, (value.index.name, value.name), [ share(value.to_numpy(), blocks) ])
+        data = [ share(value.iloc[:, i].to_numpy(), blocks) for i in range(value.shape[1]) ]
+        return SharedFrame('frame', value.columns, index, value.index.name, data)
+
+    if type(value) in (tuple, list):
+        return type(value)(share(item, blocks) for item in value)
+    if type(value) is dict:
+        return { k: share(v, blocks) for k, v in value.items() }
+    return value
+
+
+def plain(dtype):
+    '''whether `dtype` is a numpy dtype that can be shared (not an extension dtype)'''
+    import numpy as np
+    return isinstance(dtype, np.dtype) and not dtype.hasobject
+
+
+def unshare(value, blocks, copy=False):
+    '''undo `share`
+
+    With copy=False, the arrays are views of the shared memory and the blocks
+    they live in are appended to `blocks` (to be closed once the arrays are
+    no longer needed). With copy=True, the data is copied out and the blocks
+    are closed and unlinked right away.
+    '''
+    if isinstance(value, SharedArray):
+        import numpy as np
+
+        block = SharedMemory(value.name)
+        array = np.ndarray(value.shape, np.dtype(value.dtype), buffer=block.buf)
+        if not copy:
+            blocks.append(block)
+            return array
+        array = array.copy()
+        block.close()
+        block.unlink()
+        return array
+
+    if isinstance(value, SharedFrame):
+        import pandas as pd
+
+        data = [ unshare(column, blocks, copy) for column in value.data ]
+        index = unshare(value.index, blocks, copy)
+        index_name, name = value.name if value.kind == 'series' else (value.name, None)
+        if not isinstance(index, pd.Index):
+            index = pd.Index(index, name=index_name)
+        if value.kind == 'series':
+            return pd.Series(data[0], index=index, name=name, copy=False)
+        frame = pd.DataFrame(dict(enumerate(data)), index=index, copy=False)
+        frame.columns = value.columns
+        return frame
+
+    if type(value) in (tuple, list):
+        return type(value)(unshare(item, blocks, copy) for item in value)
+    if type(value) is dict:
+        return { k: unshare(v, blocks, copy) for k, v in value.items() }
+    return value
+
+
+def release(blocks, unlink=False):
+    '''close (and maybe unlink) the blocks; views into them must be gone'''
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:  # someone kept a view; the mapping goes with the process
+            pass
+        if unlink:
+            block.unlink()
+    blocks.clear()
@@ -37,6 +37,9 @@ class Item(QGraphicsItem, Stateful):
     def paint(self, painter: QPainter, option, widget):
         parent = self.parentItem()
         assert parent is not None
+        scene = self.scene()
+        if scene is not None and scene.simplifies(option, painter):  # too small to see
+            return
 
         painter.setPen(get_pen(parent._state['border']['color']))  # type: ignore
         painter.setBrush(get_brush(parent._state['border']['color']))  # type: ignore
@@ -51,6 +54,10 @@ class Item(QGraphicsItem, Stateful):
     def contextMenuEvent(self, event):
         Menu(self).exec(event.globalPos())  # type: ignore
 
+    def edges(self):
+        '''the edges that end here'''
+        return []
+
     def enabled(self):
         return self.isVisible()
 
@@ -93,6 +100,9 @@ class Input(Item):
     def edge(self):
         return self._edge
 
+    def edges(self):
+        return [] if self._edge is None else [ self._edge ]
+
     def setEdge(self, edge):
         self._edge = edge
 
@@ -102,6 +112,7 @@ class Input(Item):
     def unsetSource(self):
         if self._edge is None:
             return
+        self._edge.setSource(None)
         self._edge.setParentItem(None)
         self._edge = None
 
@@ -109,6 +120,16 @@ class Input(Item):
 class Output(Item):
     def __init__(self, entry):
         super().__init__(entry)
+        self._edges = []
+
+    def edges(self):
+        return self._edges.copy()
+
+    def addEdge(self, edge):
+        self._edges.append(edge)
+
+    def removeEdge(self, edge):
+        self._edges.remove(edge)
 
     def setParentItem(self, parent):
         super().setParentItem(parent)
@@ -0,0 +1,91 @@
+__all__ = 'Profile',
+
+from contextlib import contextmanager
+from time import perf_counter
+import sys
+
+
+class Loader:
+    '''a module loader that times `exec_module` (i.e., running the module)'''
+
+    def __init__(self, loader, profile):
+        self._loader = loader
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profile.timed(module.__name__):
+            self._loader.exec_module(module)
+
+
+class Profile:
+    '''where startup time goes: each module's import and each phase (e.g., building the window)
+
+    Like `python -X importtime`, an import's own time excludes the imports it
+    triggers. Nothing is recorded unless `enabled`.
+    '''
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.imports = []  # (module, own time, total time)
+        self.phases = []  # (name, time)
+        self._nested = []
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if hasattr(spec.loader, 'exec_module'):
+            spec.loader = Loader(spec.loader, self)
+        return spec
+
+    def start(self):
+        if self.enabled:
+            sys.meta_path.insert(0, self)
+
+    def stop(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    @contextmanager
+    def timed(self, module):
+        self._nested.append(0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            total = perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += total
+            self.imports.append((module, total - nested, total))
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.phases.append((name, perf_counter() - start))
+
+    def report(self, file=sys.stderr, limit=20):
+        if not self.enabled:
+            return
+        print('startup:', file=file)
+        for name, time in self.phases:
+            print(f'{1e3 * time:10.1f} ms  {name}', file=file)
+        own = sum(own for _, own, _ in self.imports)
+        print(f'imports: {len(self.imports)} modules in {1e3 * own:.1f} ms; the slowest (own, total):', file=file)
+        for module, own, total in sorted(self.imports, key=lambda i: i[1], reverse=True)[:limit]:
+            print(f'{1e3 * own:10.1f} ms {1e3 * total:10.1f} ms  {module}', file=file)
@@ -1,8 +1,9 @@
-__all__ = 'Stateful',
+__all__ = 'Stateful', 'materialize'
 
 from .backend import QApplication
 from debug import debug
 from json import dumps
+from collections.abc import Iterator
 
 
 class Stateful:
@@ -12,12 +13,18 @@ class Stateful:
             raise NotImplementedError
 
     def iterState(self):
+        '''the state as (key, value) pairs
+
+        Values may be other `Stateful`s and iterators, so that the state can be
+        written out piece by piece (see `store.write`); `state` turns them
+        into plain dicts and lists.
+        '''
         yield '__module__', type(self).__module__
         yield '__qualname__', type(self).__qualname__
         yield from self._state.items()
 
     def state(self):
-        return dict(self.iterState())
+        return materialize(self)
 
     def setState(self, state, missing='error', return_dunder=False):
         '''apply the state
@@ -66,3 +73,16 @@ class Stateful:
     def toClipboard(self):
         clipboard = QApplication.instance().clipboard()  # type: ignore
         clipboard.setText(self.json())
+
+
+def materialize(value):
+    '''replace `Stateful`s by their state and iterators by lists, recursively'''
+    if isinstance(value, Stateful):
+        return { key: materialize(item) for key, item in value.iterState() }
+    if isinstance(value, dict):
+        return { key: materialize(item) for key, item in value.items() }
+    if isinstance(value, list | Iterator):
+        return [ materialize(item) for item in value ]
+    if isinstance(value, tuple):
+        return tuple(materialize(item) for item in value)
+    return value
@@ -0,0 +1,417 @@
+__all__ = 'Inline', 'Spool', 'Bundle', 'Handle', 'using', 'encode', 'decode', 'handle', 'keeps', 'carry', 'location', 'read', 'write', 'stream'
+
+from base64 import b64decode, b64encode
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections.abc import Iterator
+from json import load, dumps as json_dumps
+from os import replace, link
+from pathlib import Path
+from shutil import copy2, rmtree
+from tempfile import TemporaryFile
+from dill import dumps, loads
+from .fingerprint import digest
+import sys
+
+
+class Inline:
+    '''values as base64-encoded dill strings inside the JSON
+
+    blobs: if given (a dict, or a `Spool` when writing), values are
+           deduplicated: each distinct (large) encoded value is put in
+           `blobs` once, under its digest, and referred to as
+           {"blob": digest}. The same object, or equal ones, are encoded
+           once, and decoding a blob again returns the same object.
+    derived: whether to save values that can be recomputed, see `keeps`
+    '''
+    share_limit = 256
+
+    def __init__(self, blobs=None, derived=True):
+        self.blobs = blobs
+        self.derived = derived
+        self._refs = {}
+        self._shared = {}
+
+    def pack(self, value):
+        return b64encode(dumps(value)).decode()
+
+    def unpack(self, data):
+        if isinstance(data, str):
+            return loads(b64decode(data))
+        raise ValueError(f'{type(self).__name__} cannot decode {data!r}')
+
+    def encode(self, value):
+        if self.blobs is None:
+            return self.pack(value)
+        known = self._refs.get(id(value))
+        if known is None or known[0] is not value:  # keep the value, so that the id is not reused
+            known = self._refs[id(value)] = value, self.share(self.pack(value))
+        return known[1]
+
+    def share(self, data):
+        '''put `data` in the blobs (if it is worth it) and return a reference to it'''
+        if self.blobs is None or isinstance(data, str) and len(data) < self.share_limit:
+            return data
+        key = digest(json_dumps(data, sort_keys=True).encode()).hex()
+        self.blobs.setdefault(key, data)
+        return dict(blob=key)
+
+    def unshare(self, data):
+        if isinstance(data, dict) and 'blob' in data:
+            return self.blobs[data['blob']]  # type: ignore
+        return data
+
+    def decode(self, data):
+        if not (isinstance(data, dict) and 'blob' in data):
+            return self.unpack(data)
+        key = data['blob']
+        if key not in self._shared:
+            self._shared[key] = self.unpack(self.unshare(data))
+        return self._shared[key]
+
+    def carry(self, handle):
+        '''keep what `handle` decodes from, for a value that is not saved (see `keeps`)'''
+
+
+class Spool:
+    '''the blobs of a store that is writing, kept in a temporary file rather than in memory
+
+    Each blob is written out the first time it is shared; only the digests
+    stay in memory. `stream` copies the blobs out as a JSON object.
+    '''
+    chunk = 1 << 16
+
+    def __init__(self):
+        self._keys = set()
+        self._file = TemporaryFile('w+')
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def setdefault(self, key, data):
+        if key not in self._keys:
+            self._file.write(f'{"," if self._keys else ""}{json_dumps(key)}:{json_dumps(data)}')
+            self._keys.add(key)
+        return data
+
+    def stream(self, write):
+        write('{')
+        self._file.seek(0)
+        while chunk := self._file.read(self.chunk):
+            write(chunk)
+        write('}')
+
+    def close(self):
+        self._file.close()
+
+
+class Bundle(Inline):
+    '''values as files next to the JSON manifest, in a directory bundle
+
+    A bundle `name.flowgraph/` holds `graph.json` and `values/`. Numeric numpy
+    arrays and the columns of pandas DataFrames and Series are stored as
+    `.npy` files, which are memory-mapped on load (copy-on-write, so that the
+    values can still be modified); other large values are dill files; small
+    values stay inline. Files are named by their content, so equal arrays are
+    stored once.
+
+    target: where the bundle goes once it is written (default: `root`). Values
+            that are not saved but still loaded from there keep their files.
+    '''
+    manifest = 'graph.json'
+    inline_limit = 1 << 16
+
+    def __init__(self, root, blobs=None, derived=True, target=None):
+        super().__init__(blobs, derived)
+        self.root = Path(root)
+        self.target = self.root if target is None else Path(target)
+
+    def file(self, key, suffix):
+        name = f'values/{key.hex()}{suffix}'
+        (self.root / 'values').mkdir(parents=True, exist_ok=True)
+        return name, self.root / name
+
+    def array(self, array):
+        import numpy as np
+        array = np.ascontiguousarray(array)
+        key = digest(repr((array.dtype.str, array.shape)).encode() + digest(array.view(np.uint8).reshape(-1)))
+        name, path = self.file(key, '.npy')
+        if not path.exists():
+            np.save(path, array, allow_pickle=False)
+        return dict(npy=name)
+
+    def splits(self, value):
+        '''whether `value` is, or holds, arrays or frames (which go in files of their own)'''
+        np = sys.modules.get('numpy')
+        pd = sys.modules.get('pandas')
+        if np is not None and isinstance(value, np.ndarray):
+            return not value.dtype.hasobject
+        if pd is not None and isinstance(value, pd.DataFrame | pd.Series):
+            return True
+        return type(value) in (tuple, list) and any(self.splits(item) for item in value)
+
+    def pack(self, value):
+        np = sys.modules.get('numpy')
+        pd = sys.modules.get('pandas')
+
+        if np is not None and isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            return self.array(value)
+
+        if pd is not None and isinstance(value, pd.DataFrame | pd.Series):
+            frame = value.to_frame() if isinstance(value, pd.Series) else value
+            columns = [ frame.iloc[:, i].to_numpy() for i in range(frame.shape[1]) ]
+            index = frame.index.to_numpy()
+            if not any(a.dtype.hasobject for a in columns + [ index ]):
+                kind = 'series' if isinstance(value, pd.Series) else 'frame'
+                return { kind: dict(
+                    empty=super().pack(value.iloc[:0]),  # the labels and names
+                    index=self.array(index),
+                    columns=[ self.array(a) for a in columns ],
+                ) }
+
+        if type(value) in (tuple, list) and self.splits(value):  # otherwise, one pickle is smaller and faster
+            return { type(value).__name__: [ self.pack(item) for item in value ] }
+
+        data = dumps(value)
+        if len(data) < self.inline_limit:
+            return b64encode(data).decode()
+        name, path = self.file(digest(data), '.pkl')
+        if not path.exists():
+            path.write_bytes(data)
+        return dict(dill=name)
+
+    def unpack(self, data):
+        if isinstance(data, str):
+            return super().unpack(data)
+        (kind, value), = data.items()
+        if kind == 'npy':
+            import numpy as np
+            array = np.load(self.root / value, mmap_mode='c', allow_pickle=False)
+            return array.view(np.ndarray)  # memmaps cannot be pickled, but views of them can
+        if kind == 'dill':
+            return loads((self.root / value).read_bytes())
+        if kind == 'tuple':
+            return tuple(self.unpack(item) for item in value)
+        if kind == 'list':
+            return [ self.unpack(item) for item in value ]
+        if kind in ('frame', 'series'):
+            import pandas as pd
+            empty = super().unpack(value['empty'])
+            index = pd.Index(self.unpack(value['index']), name=empty.index.name)
+            columns = [ self.unpack(column) for column in value['columns'] ]
+            if kind == 'series':
+                return pd.Series(columns[0], index=index, name=empty.name, copy=False)
+            frame = pd.DataFrame(dict(enumerate(columns)), index=index, copy=False)
+            frame.columns = empty.columns
+            return frame
+        raise ValueError(f'unknown value: {data!r}')
+
+    def files(self, data):
+        '''the files that `data` (packed) is decoded from'''
+        if isinstance(data, str):
+            return
+        (kind, value), = data.items()
+        if kind in ('npy', 'dill'):
+            yield value
+        elif kind in ('tuple', 'list'):
+            for item in value:
+                yield from self.files(item)
+        elif kind in ('frame', 'series'):
+            for item in [ value['index'] ] + value['columns']:
+                yield from self.files(item)
+
+    def carry(self, handle):
+        '''link the files of a value loaded from `target` into the bundle, so that
+        it can still be decoded once the bundle replaces the one it came from
+        '''
+        source = handle.store
+        if not isinstance(source, Bundle) or source.root.resolve() != self.target.resolve():
+            return
+        for name in source.files(source.unshare(handle.data)):
+            path = self.root / name
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(source.root / name, path)
+
+
+def link_or_copy(source, target):
+    try:
+        link(source, target)
+    except OSError:
+        copy2(source, target)
+
+
+class Handle:
+    '''a saved value that is decoded only when `resolve` is called'''
+    __slots__ = 'store', 'data'
+
+    def __init__(self, store, data):
+        self.store, self.data = store, data
+
+    def resolve(self):
+        return self.store.decode(self.data)
+
+    def encode(self):
+        '''encode the value for the current store, without decoding it if possible'''
+        data = self.store.unshare(self.data)
+        if isinstance(data, str):  # inline data is valid everywhere
+            return _store.get().share(data)
+        return encode(self.resolve())
+
+
+_store = ContextVar('store', default=Inline())
+
+
+@contextmanager
+def using(store):
+    '''encode and decode values with `store` inside the context'''
+    token = _store.set(store)
+    try:
+        yield store
+    finally:
+        _store.reset(token)
+
+
+def encode(value):
+    return _store.get().encode(value)
+
+
+def decode(data):
+    return _store.get().decode(data)
+
+
+def keeps(entry):
+    '''whether the current store saves the entry's value (see `Entry.derived`)'''
+    return _store.get().derived or not entry.derived()
+
+
+def carry(handle):
+    '''keep the files of a loaded value that the current store does not save'''
+    _store.get().carry(handle)
+
+
+def handle(data):
+    '''a `Handle` to decode `data` later, with the current store'''
+    return Handle(_store.get(), data)
+
+
+def location(path):
+    '''where `path` is saved: the bundle, for the manifest inside one'''
+    path = Path(path)
+    if path.name == Bundle.manifest and path.parent.suffix == '.flowgraph':
+        return path.parent
+    return path
+
+
+def read(path):
+    '''load a JSON file or bundle; returns the state and the store to decode it with
+
+    path: a JSON file, a bundle or the manifest inside one
+    '''
+    path = Path(path)
+    if path.is_dir():
+        path = path / Bundle.manifest
+    with open(path) as file:
+        state = load(file)
+    blobs = state.pop('blobs', {})
+    if path.parent.suffix == '.flowgraph':
+        return state, Bundle(path.parent, blobs)
+    return state, Inline(blobs)
+
+
+def stream(value, write):
+    '''write `value` as compact JSON, piece by piece
+
+    Objects with an `iterState` (i.e., `Stateful`s) are written as objects,
+    and iterators as arrays, without building the whole state first.
+    '''
+    if hasattr(value, 'iterState'):
+        return stream_items(value.iterState(), write)
+    if isinstance(value, Spool):
+        return value.stream(write)
+    if isinstance(value, dict):
+        return stream_items(value.items(), write)
+    if isinstance(value, list | tuple | Iterator):
+        write('[')
+        for i, item in enumerate(value):
+            if i:
+                write(',')
+            stream(item, write)
+        return write(']')
+    write(json_dumps(value))
+
+
+def stream_items(items, write):
+    write('{')
+    for i, (key, value) in enumerate(items):
+        if i:
+            write(',')
+        write(json_dumps(key))
+        write(':')
+        stream(value, write)
+    write('}')
+
+
+def stream_state(state, store, write):
+    '''write the state and then the blobs that its values went into'''
+    def items():
+        yield from (state.iterState() if hasattr(state, 'iterState') else state().items())
+        if store.blobs:
+            yield 'blobs', store.blobs
+    with using(store):
+        stream_items(items(), write)
+    write('\n')
+
+
+def write(path, state, derived=True):
+    '''save a state to a JSON file, or to a bundle if the path ends with .flowgraph
+    (or names the manifest inside one)
+
+    state: a `Stateful` (which is written out as it is walked) or a function
+           that returns the state
+    derived: with False, only the values that cannot be recomputed are saved
+
+    Values are deduplicated (see `Inline`); the blobs go in the top-level
+    "blobs", through a `Spool`, so that they are not all held in memory until
+    then. Files are written next to the old ones, which they then replace.
+    Values still mapped from an old bundle remain valid, and values not yet
+    decoded from it keep their files (see `Bundle.carry`), even when they are
+    not saved.
+    '''
+    path = location(path)
+    temp = path.with_name(f'.{path.name}.tmp')
+    blobs = Spool()
+    if path.suffix != '.flowgraph':
+        try:
+            with open(temp, 'w') as file:
+                stream_state(state, Inline(blobs, derived), file.write)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+        finally:
+            blobs.close()
+        replace(temp, path)
+        return
+
+    rmtree(temp, ignore_errors=True)
+    temp.mkdir()
+    try:
+        bundle = Bundle(temp, blobs, derived, target=path)
+        with open(temp / bundle.manifest, 'w') as file:
+            stream_state(state, bundle, file.write)
+    except BaseException:
+        rmtree(temp, ignore_errors=True)
+        raise
+    finally:
+        blobs.close()
+    if path.exists():
+        old = path.with_name(f'.{path.name}.old')
+        rmtree(old, ignore_errors=True)
+        replace(path, old)
+        replace(temp, path)
+        rmtree(old)
+    else:
+        replace(temp, path)
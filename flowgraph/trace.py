@@ -0,0 +1,116 @@
+__all__ = 'Tracer', 'span', 'cause', 'start', 'stop', 'tracing', 'active'
+
+from contextlib import contextmanager, nullcontext
+from json import dump
+from os import getpid
+from threading import get_ident, local
+from time import perf_counter
+
+
+class Tracer:
+    '''collects events in the trace event format (chrome://tracing, Perfetto)
+
+    Every span gets an `id` and the `parent` span it ran in. A node that is
+    computed because something requested it also gets the `cause`: the span
+    that made the request (drawn as an arrow in chrome://tracing and Perfetto).
+    '''
+
+    def __init__(self):
+        self.events = []
+        self._t0 = perf_counter()
+        self._ids = 0
+        self._local = local()
+        self._causes = {}
+
+    def now(self):
+        return 1e6 * (perf_counter() - self._t0)
+
+    def stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def event(self, **event):
+        event.setdefault('pid', getpid())
+        event.setdefault('tid', get_ident())
+        self.events.append(event)
+
+    def cause(self, key):
+        '''remember that the current span caused whatever `key` stands for'''
+        stack = self.stack()
+        if not stack or key in self._causes:  # the first request wins
+            return
+        self._ids += 1
+        self._causes[key] = stack[-1], self._ids
+        self.event(name='cause', cat='flow', ph='s', id=self._ids, ts=self.now())
+
+    @contextmanager
+    def span(self, name, cat='', effect=None, **args):
+        stack = self.stack()
+        self._ids += 1
+        id = self._ids
+        args.update(id=id, parent=stack[-1] if stack else None)
+
+        start = self.now()
+        if effect is not None and effect in self._causes:
+            args['cause'], flow = self._causes.pop(effect)
+            self.event(name='cause', cat='flow', ph='f', bp='e', id=flow, ts=start)
+
+        stack.append(id)
+        try:
+            yield id
+        finally:
+            stack.pop()
+            self.event(name=name, cat=cat, ph='X', ts=start, dur=self.now() - start, args=args)
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            dump(dict(traceEvents=self.events, displayTimeUnit='ms'), file)
+
+
+_tracer = None
+_null = nullcontext()
+
+
+def active():
+    return _tracer
+
+
+def span(name, cat='', effect=None, **args):
+    '''a context manager timing what happens inside it (if tracing)
+
+    effect: what the span does, e.g., a node it computes; if a `cause` was
+            recorded for it, the span is linked to that cause
+    '''
+    if _tracer is None:
+        return _null
+    return _tracer.span(name, cat, effect, **args)
+
+
+def cause(key):
+    if _tracer is not None:
+        _tracer.cause(key)
+
+
+def start():
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+@contextmanager
+def tracing(path=None):
+    '''trace what happens inside; save it to `path` (if given) at the end'''
+    tracer = start()
+    try:
+        yield tracer
+    finally:
+        stop()
+        if path is not None:
+            tracer.save(path)
@@ -2,12 +2,13 @@ __all__ = (
     'partial', 'ignore_args', 'call_all', 'cache', 'wraps',
     'get_static_object', 'get_static_object_from_state', 'get_object', 'get_object_from_state',
     'static_object_state', 'bound_method_state', 'object_state', 'split_at',
-    'with_actions', 'toggle',
+    'with_actions', 'toggle', 'memoize', 'threaded', 'in_process', 'coalesce', 'new_id',
 )
 
 from functools import partial, wraps, cache
 from importlib import import_module
 from types import MethodType
+from uuid import uuid4
 from debug import debug
 from funcpipes import Pipe
 
@@ -84,6 +85,11 @@ def object_state(obj):
     return f(obj)
 
 
+def new_id():
+    '''a short random ID for nodes and entries'''
+    return uuid4().hex[:12]
+
+
 def split_at(n):
     def inner(seq):
         return seq[:n], seq[n:]
@@ -100,3 +106,35 @@ def with_actions(actions: dict):
 def toggle(func):
     func.__toggle__ = True
     return func
+
+
+def memoize(maxsize=128):
+    '''cache up to `maxsize` of the function's most recent results in its node'''
+    def add_memo(func):
+        func.__memoize__ = maxsize
+        return func
+    return add_memo
+
+
+def threaded(func):
+    '''evaluate the function's node on a worker thread instead of the GUI thread'''
+    func.__executor__ = 'thread'
+    return func
+
+
+def in_process(func):
+    '''evaluate the function's node in a worker process; numpy arrays (also
+    DataFrame columns) go through shared memory instead of being pickled
+
+    The function must be picklable, i.e., defined at the top level of a module.
+    '''
+    func.__executor__ = 'process'
+    return func
+
+
+def coalesce(delay=None, max_wait=None):
+    '''collapse bursts of edits of the function's inputs, see `entry.Coalescing`'''
+    def add_coalesce(func):
+        func.__coalesce__ = dict(delay=delay, max_wait=max_wait)
+        return func
+    return add_coalesce
@@ -7,11 +7,14 @@ from .util import ignore_args
 from debug import debug
 from pathlib import Path
 from .stateful import Stateful
-from tempfile import NamedTemporaryFile
-from shutil import copy
-from json import dump, load
+from . import store
+from .journal import Journal
 from functools import partial
 
+BUNDLE = 'Flowgraph Bundles (*.flowgraph)'
+FILTERS = f'JSON Files (*.json);;{BUNDLE}'
+OPEN_FILTERS = f'JSON Files (*.json);;Flowgraph Bundles ({store.Bundle.manifest})'  # a bundle is opened by its manifest
+
 
 class Window(QMainWindow, Stateful):
     def __init__(self, title=None, functions=(), state_file: Path | None = None):
@@ -20,6 +23,7 @@ class Window(QMainWindow, Stateful):
         self.show()
 
         self._state_file = state_file
+        self._journal = None
         self._title = title
         self.updateTitle()
 
@@ -51,6 +55,8 @@ class Window(QMainWindow, Stateful):
 
         if state_file is not None and state_file.exists():
             self.loadState(force_dialog=False)
+        elif state_file is not None:
+            self.startJournal(state_file)
 
     def updateTitle(self):
         return self.setWindowTitle(self._title if self._state_file is None else f'{self._title} ({self._state_file})')
@@ -61,6 +67,21 @@ class Window(QMainWindow, Stateful):
     def editor(self):
         return self._editor
 
+    def journal(self):
+        return self._journal
+
+    def startJournal(self, path):
+        '''autosave the changes to the state in `path`, after recovering any left over from a crash'''
+        if self._journal is not None:
+            self._journal.stop(remove=True)
+            self._journal.deleteLater()
+        self._journal = Journal(self, path)
+        if self._journal.recover():
+            self.statusBar().showMessage(f'recovered the unsaved changes to {path}')
+            self._journal.start()
+        else:
+            self._journal.start(path if Path(path).exists() else None)
+
     def populate_menu_bar(self, *items):
         bar = self.menuBar()
         assert bar is not None
@@ -75,7 +96,7 @@ class Window(QMainWindow, Stateful):
     def iterState(self):
         yield from super().iterState()
         yield 'title', self._title
-        yield 'editor', self.editor().state()
+        yield 'editor', self.editor()
 
     def setState(self, state):
         state = super().setState(state, missing='return')
@@ -87,36 +108,42 @@ class Window(QMainWindow, Stateful):
                 self.updateTitle()
             elif key == 'editor':
                 self.editor().setState(value)
+                recomputed = self.editor().scene().recomputed()
+                if recomputed is not None:
+                    self.statusBar().showMessage(f'recomputed the derived values in {recomputed:.3f} s')
             else:
                 raise KeyError(key)
 
     def loadState(self, force_dialog=True):
         if self._state_file is None or force_dialog:
-            path, filter = QFileDialog.getOpenFileName(self, 'Save File', '', 'JSON Files (*.json)')
+            path, filter = QFileDialog.getOpenFileName(self, 'Open File', '', OPEN_FILTERS)
             if not path:
                 return
         else:
             path = self._state_file
 
-        with open(path) as file:
-            self.setState(load(file))
+        path = str(store.location(path))  # saving then replaces the bundle rather than its manifest
+        state, values = store.read(path)
+        with store.using(values):
+            self.setState(state)
 
         self._state_file = path
         self.updateTitle()
+        self.startJournal(path)
 
     def saveState(self, force_dialog=False):
         if self._state_file is None or force_dialog:
-            path, filter = QFileDialog.getSaveFileName(self, 'Save File', '', 'JSON Files (*.json)')
+            path, filter = QFileDialog.getSaveFileName(self, 'Save File', '', FILTERS)
             if not path:
                 return
+            if filter == BUNDLE and not path.endswith('.flowgraph'):
+                path += '.flowgraph'
+            path = str(store.location(path))
         else:
             path = self._state_file
 
-        with NamedTemporaryFile('w') as file:
-            dump(self.state(), file, indent='\t')
-            print(file=file)
-            file.flush()
-            copy(file.name, path)
+        store.write(path, self, derived=self.editor().scene().savesDerived())
 
         self._state_file = path
         self.updateTitle()
+        self.startJournal(path)